@@ -0,0 +1,107 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import shapely
+from map_layers import EncodedLayer, tooltip_table
+from proximity_index import METRES_PER_KM
+from reproject import SCHEME_CRS, WGS84
+
+# Catchment buffers around the schemes. Scheme coordinates are already in a
+# projected metric CRS (EPSG:22236), so the buffers are true circles of the
+# requested radius; they are only taken to WGS84 for the map.
+BUFFER_RADII_KM = (5, 10, 25, 50)
+
+# Segments per quarter circle; 16 keeps a 50 km buffer within ~120 m of the
+# true circle
+BUFFER_QUAD_SEGS = 16
+
+# Fill colors by radius, innermost first
+RADIUS_COLORS = ("#1a9850", "#91cf60", "#fee08b", "#fc8d59", "#d73027")
+
+
+def scheme_buffers(schemes, radii_km=BUFFER_RADII_KM, dissolve=False):
+    """Buffers of every scheme at every radius, in the scheme CRS.
+
+    Returns a GeoDataFrame with ``scheme_name``, ``status``, ``radius_km``
+    and ``area_km2``, one row per scheme and radius, largest radius first so
+    smaller rings draw on top. With ``dissolve`` overlapping buffers of the
+    same radius are merged into one row per radius, with the number of
+    schemes in ``schemes``.
+    """
+    points = shapely.points(
+        schemes["longitude"].to_numpy(dtype=float),
+        schemes["latitude"].to_numpy(dtype=float),
+    )
+    radii_km = sorted(radii_km, reverse=True)
+    radius = np.repeat(np.asarray(radii_km, dtype=float), len(points))
+    geometry = shapely.buffer(
+        np.tile(points, len(radii_km)),
+        radius * METRES_PER_KM,
+        quad_segs=BUFFER_QUAD_SEGS,
+    )
+    buffers = gpd.GeoDataFrame(
+        {
+            "scheme_name": np.tile(schemes["scheme_name"].to_numpy(), len(radii_km)),
+            "status": np.tile(schemes["status"].to_numpy(), len(radii_km)),
+            "radius_km": radius,
+        },
+        geometry=geometry,
+        crs=SCHEME_CRS,
+    )
+    if dissolve:
+        buffers = gpd.GeoDataFrame(
+            {
+                "radius_km": radii_km,
+                "schemes": [len(points)] * len(radii_km),
+            },
+            geometry=[
+                shapely.union_all(buffers.geometry.values[buffers["radius_km"] == r])
+                for r in radii_km
+            ],
+            crs=SCHEME_CRS,
+        )
+    return buffers.assign(area_km2=buffers.area / METRES_PER_KM**2)
+
+
+def to_wkb(buffers):
+    """Attributes plus WKB geometry, e.g. for DuckDB or Parquet."""
+    return pd.DataFrame(buffers.drop(columns="geometry")).assign(
+        geometry=shapely.to_wkb(buffers.geometry.values)
+    )
+
+
+def from_wkb(frame, crs=SCHEME_CRS):
+    """The buffers back from :func:`to_wkb` output, e.g. a stored table."""
+    geometry = shapely.from_wkb([bytes(g) for g in frame["geometry"]])
+    return gpd.GeoDataFrame(frame.drop(columns="geometry"), geometry=geometry, crs=crs)
+
+
+def to_geoarrow(buffers):
+    """A pyarrow table with a native GeoArrow geometry column."""
+    return pa.table(buffers.to_arrow(geometry_encoding="geoarrow"))
+
+
+def to_feature_collection(buffers):
+    """One WGS84 GeoJSON FeatureCollection for all buffers."""
+    return buffers.to_crs(WGS84).__geo_interface__
+
+
+def buffer_layer(buffers, name="Buffers", tooltip=("scheme_name", "radius_km")):
+    """All buffers as a single encoded layer, one shared style per radius."""
+    buffers = buffers.to_crs(WGS84)
+    radii = sorted(set(buffers["radius_km"]))
+    colors = [RADIUS_COLORS[min(i, len(RADIUS_COLORS) - 1)] for i in range(len(radii))]
+    styles = [
+        {"color": color, "fillColor": color, "weight": 1, "fillOpacity": 0.1}
+        for color in colors
+    ]
+    fields = [field for field in tooltip if field in buffers.columns]
+    return EncodedLayer(
+        "polygon",
+        buffers.geometry.values,
+        styles,
+        np.searchsorted(radii, buffers["radius_km"].to_numpy()),
+        tooltip_table(buffers, fields) if fields else None,
+        name=name,
+    )
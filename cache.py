@@ -0,0 +1,234 @@
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import shapely
+import streamlit as st
+from tracing import note, span
+
+# Process-wide cache shared by src/frontend.py and every page. Entries are
+# tied to the source files they were built from and rebuilt as soon as one
+# of those files changes; the least recently used entries are dropped once
+# the cache holds more than its memory budget.
+CACHE_BUDGET_MB = int(os.environ.get("HYDRO_CACHE_MB", "512"))
+
+# Bytes counted per coordinate pair of a shapely geometry
+BYTES_PER_COORDINATE = 16
+
+# Bytes counted per geometry of an STRtree (its envelope and node pointers)
+BYTES_PER_TREE_ENTRY = 48
+
+
+def file_stamp(path):
+    """(size, mtime) of ``path``, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def estimate_size(value):
+    """Approximate memory held by ``value`` in bytes."""
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        size = int(value.memory_usage(deep=True).sum())
+        # Geometries only count as pointers above; add their coordinates
+        for column in value.columns[value.dtypes.astype(str) == "geometry"]:
+            coordinates = shapely.get_num_coordinates(value[column].values).sum()
+            size += int(coordinates) * BYTES_PER_COORDINATE
+        return size
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(getattr(value, "frame", None), pd.DataFrame):
+        # Spatial indexes (viewport.LayerIndex): the frame plus its STRtree
+        return estimate_size(value.frame) + len(value.frame) * BYTES_PER_TREE_ENTRY
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    # Arguments become part of the entry key; frames and arrays are keyed by
+    # a digest of their contents
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        return hashlib.sha256(
+            pd.util.hash_pandas_object(value).to_numpy().tobytes()
+            + pickle.dumps(list(labels))
+        ).hexdigest()
+    if isinstance(value, np.ndarray):
+        return hashlib.sha256(value.tobytes()).hexdigest()
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _label(name, args, kwargs):
+    # Readable entry name for the stats table; content digests are shortened
+    def short(value):
+        text = repr(value)
+        return text if len(text) <= 24 else f"{text[:21]}..."
+
+    shown = [short(a) for a in args] + [f"{k}={short(v)}" for k, v in kwargs]
+    return f"{name}({', '.join(shown)})" if shown else name
+
+
+class CacheEntry:
+    def __init__(self, name):
+        self.name = name
+        self.value = None
+        self.stamps = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.loaded = False
+        # Held while the value is built, so concurrent callers wait for that
+        # build instead of starting their own
+        self.building = threading.RLock()
+
+
+class ResourceCache:
+    """LRU cache with file-based invalidation and per-entry hit/miss counts."""
+
+    def __init__(self, budget_mb=CACHE_BUDGET_MB):
+        self.budget = budget_mb * 2**20
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, build, sources=(), name=None):
+        """The value stored under ``key``, calling ``build()`` when it is
+        missing or any of the ``sources`` files changed since it was built."""
+        stamps = tuple((path, file_stamp(path)) for path in sources)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = CacheEntry(name or str(key))
+            hit, value = self._lookup(key, entry, stamps, count_miss=False)
+        if hit:
+            note(cache_hits=1)
+            return value
+
+        with entry.building:
+            # Another caller may have built it while this one waited
+            with self.lock:
+                hit, value = self._lookup(key, entry, stamps)
+            if hit:
+                note(cache_hits=1)
+                return value
+
+            note(cache_misses=1)
+            with span(entry.name) as built:
+                value = built.add_rows(build())
+            size = estimate_size(value)
+            with self.lock:
+                self.size -= entry.size
+                entry.value, entry.stamps, entry.size, entry.loaded = (
+                    value,
+                    stamps,
+                    size,
+                    True,
+                )
+                self.size += size
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+                self._evict(keep=key)
+        return value
+
+    def _lookup(self, key, entry, stamps, count_miss=True):
+        # Called with the lock held; (hit, value)
+        if entry.loaded and entry.stamps == stamps:
+            entry.hits += 1
+            self.entries.move_to_end(key)
+            return True, entry.value
+        if count_miss:
+            entry.misses += 1
+        return False, None
+
+    def _evict(self, keep):
+        # Oldest first; the entry just built is kept even if it alone is over
+        for key in list(self.entries):
+            if self.size <= self.budget:
+                break
+            entry = self.entries[key]
+            if key == keep or not entry.loaded:
+                continue
+            self.size -= entry.size
+            entry.value, entry.size, entry.loaded = None, 0, False
+
+    def invalidate(self, key=None):
+        with self.lock:
+            for k in [key] if key is not None else list(self.entries):
+                entry = self.entries.get(k)
+                if entry is not None and entry.loaded:
+                    self.size -= entry.size
+                    entry.value, entry.size, entry.loaded = None, 0, False
+
+    def stats(self):
+        """One row per entry: hits, misses, resident size and source files."""
+        with self.lock:
+            return pd.DataFrame(
+                [
+                    {
+                        "entry": entry.name,
+                        "hits": entry.hits,
+                        "misses": entry.misses,
+                        "cached": entry.loaded,
+                        "size_mb": entry.size / 2**20,
+                        "sources": ", ".join(path for path, _ in entry.stamps or ()),
+                    }
+                    for entry in self.entries.values()
+                ],
+                columns=["entry", "hits", "misses", "cached", "size_mb", "sources"],
+            )
+
+
+CACHE = ResourceCache()
+
+
+def cached(*sources, cache=CACHE):
+    """Decorator caching a function's result in the shared cache.
+
+    ``sources`` are file paths, or callables returning one (resolved on every
+    call, e.g. ``roads_path``); the result is rebuilt when any of them
+    changes. Arguments are part of the key, so every distinct call gets its
+    own entry.
+    """
+
+    def decorate(func):
+        qualname = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (qualname, _freeze(args), _freeze(kwargs))
+            paths = [source() if callable(source) else source for source in sources]
+            name = _label(func.__qualname__, key[1], key[2])
+            return cache.get(key, lambda: func(*args, **kwargs), paths, name)
+
+        return wrapper
+
+    return decorate
+
+
+def cache_panel(container=None, cache=CACHE):
+    """Show the cache statistics in an expander (the sidebar by default)."""
+    stats = cache.stats()
+    with (container or st.sidebar).expander("Cache"):
+        st.caption(
+            f"{stats['size_mb'].sum():.1f} of {cache.budget / 2**20:.0f} MB, "
+            f"{stats['hits'].sum()} hits, {stats['misses'].sum()} misses"
+        )
+        st.dataframe(stats, hide_index=True, use_container_width=True)
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import numpy as np
+from ingest import DATA_DIR
+from road_graph import RoadGraph, build_graph
+
+GRAPH_DIR = os.path.join(DATA_DIR, "graphs")
+
+# Arrays saved per graph, one .npy file each, in RoadGraph argument order
+GRAPH_ARRAYS = (
+    "node_xy",
+    "node_metric",
+    "edge_u",
+    "edge_v",
+    "edge_length",
+    "edge_road",
+    "indptr",
+    "indices",
+    "weights",
+)
+
+METRICS_FILE = "metrics.json"
+
+# Graphs kept in GRAPH_DIR; every change to the road file or filter builds a
+# new one, so the least recently used beyond this many are removed
+GRAPH_KEEP = int(os.environ.get("HYDRO_GRAPH_KEEP", "3"))
+
+
+def graph_path(key, directory=GRAPH_DIR):
+    return os.path.join(directory, key)
+
+
+def is_complete(path):
+    # The metrics file is written last, and only renamed into place with the
+    # rest of the directory
+    return os.path.exists(os.path.join(path, METRICS_FILE))
+
+
+def save_graph(graph, path, key):
+    """Write the graph arrays and its metrics to the directory ``path``.
+
+    Everything goes to a temporary directory that is renamed into place at
+    the end, so readers never see a half-written graph. When another process
+    saved the same graph first, its copy is kept.
+    """
+    tmp = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in GRAPH_ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), getattr(graph, name))
+    with open(os.path.join(tmp, METRICS_FILE), "w") as f:
+        json.dump({**graph.metrics(), "source_key": key}, f)
+
+    if not is_complete(path):
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp, path)
+            return path
+        except OSError:
+            # Renamed into place by another process in the meantime
+            if not is_complete(path):
+                raise
+    shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def prune_graphs(directory=GRAPH_DIR, keep=GRAPH_KEEP):
+    """Remove all but the ``keep`` most recently used graphs; returns how many."""
+    graphs = [
+        os.path.join(directory, entry)
+        for entry in os.listdir(directory)
+        if ".tmp" not in entry and is_complete(os.path.join(directory, entry))
+    ]
+    graphs.sort(key=os.path.getmtime, reverse=True)
+    for path in graphs[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+    return max(len(graphs) - keep, 0)
+
+
+def load_graph(path, mmap_mode="r"):
+    """Open a saved graph. The arrays are memory-mapped read-only by default,
+    so opening costs a few file opens and no copies."""
+    return RoadGraph(
+        *(
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in GRAPH_ARRAYS
+        )
+    )
+
+
+def graph_metrics(path):
+    """Node count, edge count and density stored with the graph."""
+    with open(os.path.join(path, METRICS_FILE)) as f:
+        return json.load(f)
+
+
+def ensure_graph(key, load_roads, directory=GRAPH_DIR, precision=None):
+    """Path of the graph built from ``key``, building it if it is not cached.
+
+    ``key`` should identify the road file and filter (``road_tiles.source_key``);
+    ``load_roads`` is only called on a miss.
+    """
+    key = f"{key}-p{precision}"
+    path = graph_path(key, directory)
+    if is_complete(path):
+        # Marks the graph as recently used for prune_graphs
+        os.utime(path)
+        return path
+    os.makedirs(directory, exist_ok=True)
+    save_graph(build_graph(load_roads(), precision), path, key)
+    prune_graphs(directory)
+    return path
@@ -0,0 +1,114 @@
+import os
+import duckdb
+
+# Column name -> (path inside each GeoJSON feature, DuckDB type)
+SCHEME_COLUMNS = {
+    "scheme_name": ("properties.Scheme_Nam", "VARCHAR"),
+    "status": ("properties.Status", "VARCHAR"),
+    "longitude": ("geometry.coordinates[1]", "DOUBLE"),
+    "latitude": ("geometry.coordinates[2]", "DOUBLE"),
+}
+
+PLACES_COLUMNS = {
+    "fid": ("properties.fid", "INTEGER"),
+    "NAME": ("properties.NAME", "VARCHAR"),
+    "ADMIN1": ("properties.ADMIN1", "VARCHAR"),
+    "COUNTRY": ("properties.COUNTRY", "VARCHAR"),
+    "CNTRY_FIPS": ("properties.CNTRY_FIPS", "VARCHAR"),
+    "TYPE": ("properties.TYPE", "INTEGER"),
+    "CLASS": ("properties.CLASS", "INTEGER"),
+    "LONGITUDE": ("properties.LONGITUDE", "DOUBLE"),
+    "LATITUDE": ("properties.LATITUDE", "DOUBLE"),
+    "ID": ("properties.ID", "DOUBLE"),
+}
+
+ROAD_COLUMNS = {
+    "osm_id": ("properties.osm_id", "BIGINT"),
+    "highway": ("properties.highway", "VARCHAR"),
+    "surface": ("properties.surface", "VARCHAR"),
+    "coordinates": ("geometry.coordinates", "DOUBLE[][]"),
+}
+
+HYDRO_FILE = "hydro.json"
+PLACES_FILE = "mlwplaces_point.json"
+ROADS_FILE = "hotosm_mwi_roads_lines_geojson.geojson"
+
+# GeoParquet copies written by src/utils/prepare_data.py
+DATA_DIR = "data"
+PLACES_PARQUET = os.path.join(DATA_DIR, "places.parquet")
+ROADS_PARQUET = os.path.join(DATA_DIR, "roads.parquet")
+
+
+def feature_query(path, columns):
+    # A FeatureCollection is a single JSON document, so the object size limit
+    # has to cover the whole file
+    select = ",\n    ".join(
+        f'CAST(feature.{source} AS {sql_type}) AS "{name}"'
+        for name, (source, sql_type) in columns.items()
+    )
+    query = f"""
+SELECT
+    {select}
+FROM (
+    SELECT unnest(features) AS feature
+    FROM read_json(?, maximum_object_size = {os.path.getsize(path) + 1024})
+)
+"""
+    return query, [path]
+
+
+def load_feature_collection(con, table, path, columns):
+    """Replace ``table`` with one row per feature of the GeoJSON file at ``path``.
+
+    The file is parsed and inserted by DuckDB in a single columnar statement.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"GeoJSON file not found at {path}")
+
+    query, params = feature_query(path, columns)
+    con.execute(f"CREATE OR REPLACE TABLE {table} AS {query}", params)
+    return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def read_feature_collection(path, columns):
+    """Read the GeoJSON file at ``path`` straight into a DataFrame."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"GeoJSON file not found at {path}")
+
+    query, params = feature_query(path, columns)
+    with duckdb.connect(":memory:") as con:
+        return con.execute(query, params).fetchdf()
+
+
+def load_parquet(con, table, path, columns):
+    """Replace ``table`` with the property columns of a GeoParquet file.
+
+    Only the listed columns are read, so DuckDB skips the geometry and any
+    other column chunks entirely.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"GeoParquet file not found at {path}")
+
+    select = ", ".join(
+        f'CAST("{source.removeprefix("properties.")}" AS {sql_type}) AS "{name}"'
+        for name, (source, sql_type) in columns.items()
+    )
+    con.execute(
+        f"CREATE OR REPLACE TABLE {table} AS SELECT {select} FROM read_parquet(?)",
+        [path],
+    )
+    return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def load_schemes(con, path=HYDRO_FILE):
+    return load_feature_collection(con, "hydropower_schemes", path, SCHEME_COLUMNS)
+
+
+def load_places(con, path=PLACES_FILE):
+    if path.endswith(".parquet"):
+        return load_parquet(con, "malawi_places", path, PLACES_COLUMNS)
+    return load_feature_collection(con, "malawi_places", path, PLACES_COLUMNS)
+
+
+def load_roads(con, path=ROADS_FILE):
+    return load_feature_collection(con, "roads", path, ROAD_COLUMNS)
@@ -0,0 +1,241 @@
+import json
+import html
+import numpy as np
+import shapely
+from folium.map import Layer
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+
+# Decimal places kept for marker coordinates; 5 places is about a metre
+COORDINATE_PRECISION = 5
+
+# Neighbor lines shorter than this are drawn green, longer ones orange
+NEAR_KM = 50
+
+
+def point_layer(
+    lats,
+    lons,
+    labels,
+    colors,
+    name=None,
+    tooltip=False,
+    precision=COORDINATE_PRECISION,
+    **cluster_options,
+):
+    """A clustered marker layer rendered client-side from one compact array.
+
+    Each point is sent as ``[lat, lon, color index, label]`` and the markers
+    are created in the browser, so the map HTML holds no per-marker objects.
+    The array is still embedded in the HTML: it grows by roughly the label
+    length plus 20 bytes per point, about 40 KB per thousand places.
+    ``labels`` become the popups (and tooltips when ``tooltip`` is set).
+    """
+    palette, color_index = np.unique(np.asarray(colors, dtype=str), return_inverse=True)
+    rows = [
+        [lat, lon, int(color), label]
+        for lat, lon, color, label in zip(
+            np.round(np.asarray(lats, dtype=float), precision).tolist(),
+            np.round(np.asarray(lons, dtype=float), precision).tolist(),
+            color_index,
+            labels,
+        )
+    ]
+
+    # One icon per color, built once rather than once per marker
+    callback = f"""(function () {{
+        var icons = {json.dumps(palette.tolist())}.map(function (color) {{
+            return L.AwesomeMarkers.icon({{markerColor: color}});
+        }});
+        return function (row) {{
+            var marker = L.marker(new L.LatLng(row[0], row[1]), {{icon: icons[row[2]]}});
+            marker.bindPopup(row[3]);
+            {"marker.bindTooltip(row[3]);" if tooltip else ""}
+            return marker;
+        }};
+    }})()"""
+    return FastMarkerCluster(rows, callback=callback, name=name, **cluster_options)
+
+
+def _counts(values):
+    # A nesting level whose counts are all equal is sent as one number
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) and (values == values[0]).all():
+        return int(values[0])
+    return values.tolist()
+
+
+def encode_geometries(geometries, precision=COORDINATE_PRECISION):
+    """Quantized, delta-encoded coordinates of WGS84 shapely geometries.
+
+    Coordinates are rounded to ``precision`` decimals, scaled to integers and
+    sent as differences from the previous vertex, so most take a few digits.
+    ``levels`` holds the nesting counts the browser needs to rebuild each
+    geometry: parts per feature, then vertices per line, or rings per
+    polygon and vertices per ring. Closing vertices of rings are dropped,
+    since Leaflet closes polygons itself.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    parts, feature = shapely.get_parts(geometries, return_index=True)
+    levels = [np.bincount(feature, minlength=len(geometries))]
+    if len(parts) and shapely.get_type_id(parts[0]) == 3:
+        rings, polygon = shapely.get_rings(parts, return_index=True)
+        levels.append(np.bincount(polygon, minlength=len(parts)))
+        parts, closing = rings, 1
+    else:
+        closing = 0
+    coords, part = shapely.get_coordinates(parts, return_index=True)
+    sizes = np.bincount(part, minlength=len(parts))
+    if closing:
+        ends = np.cumsum(sizes) - 1
+        coords = np.delete(coords, ends[sizes > 0], axis=0)
+        sizes = np.maximum(sizes - 1, 0)
+    levels.append(sizes)
+
+    ints = np.round(coords * 10**precision).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return {
+        "scale": 10**precision,
+        "levels": [_counts(level) for level in levels],
+        "coords": deltas.ravel().tolist(),
+    }
+
+
+class EncodedLayer(Layer):
+    """Lines, polygons or markers decoded in the browser from one payload.
+
+    Features share their style objects: ``styles`` is a list of Leaflet path
+    options (or marker colors for ``kind="marker"``) and each feature only
+    carries its index into it, plus an optional tooltip and popup.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function (data) {
+            var group = L.featureGroup();
+            var c = data.coords, s = data.scale, k = 0, x = 0, y = 0;
+            var at = data.levels.map(function () { return 0; });
+            function count(level) {
+                var n = data.levels[level];
+                return typeof n === "number" ? n : n[at[level]++];
+            }
+            function read(level) {
+                var out = [], n = count(level);
+                for (var i = 0; i < n; i++) {
+                    if (level === data.levels.length - 1) {
+                        x += c[k++]; y += c[k++];
+                        out.push([y / s, x / s]);
+                    } else {
+                        out.push(read(level + 1));
+                    }
+                }
+                return out;
+            }
+            var styles = data.styles;
+            if (data.kind === "marker") {
+                styles = styles.map(function (color) {
+                    return {icon: L.AwesomeMarkers.icon({
+                        markerColor: color, icon: "info-sign",
+                        prefix: "glyphicon", iconColor: "white"})};
+                });
+            }
+            for (var i = 0; i < data.style.length; i++) {
+                var parts = read(0), layer;
+                var style = styles[data.style[i]];
+                if (data.kind === "marker") {
+                    layer = L.marker(parts[0][0], style);
+                } else if (data.kind === "polygon") {
+                    layer = L.polygon(parts, style);
+                } else {
+                    layer = L.polyline(parts, style);
+                }
+                if (data.tooltip) layer.bindTooltip(data.tooltip[i], {sticky: true});
+                if (data.popup) layer.bindPopup(data.popup[i]);
+                group.addLayer(layer);
+            }
+            return group;
+        })({{ this.data }});
+        {% endmacro %}
+        """
+    )
+
+    def __init__(
+        self,
+        kind,
+        geometries,
+        styles,
+        style_index,
+        tooltips=None,
+        popups=None,
+        name=None,
+        precision=COORDINATE_PRECISION,
+        **kwargs,
+    ):
+        super().__init__(name=name, **kwargs)
+        self._name = "EncodedLayer"
+        data = {
+            "kind": kind,
+            **encode_geometries(geometries, precision),
+            "styles": list(styles),
+            "style": np.asarray(style_index, dtype=np.int64).tolist(),
+        }
+        if tooltips is not None:
+            data["tooltip"] = [str(t) for t in tooltips]
+        if popups is not None:
+            data["popup"] = [str(p) for p in popups]
+        self.data = json.dumps(data, separators=(",", ":"))
+
+
+def styled(keys):
+    """(distinct keys, index of each key in them) for per-style grouping."""
+    distinct, index = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+    return distinct.tolist(), index
+
+
+def marker_layer(lats, lons, colors, popups, name=None, precision=COORDINATE_PRECISION):
+    """Unclustered markers colored like ``folium.Icon(color=...)``."""
+    palette, index = styled(colors)
+    points = shapely.points(
+        np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+    )
+    return EncodedLayer(
+        "marker", points, palette, index, popups=popups, name=name, precision=precision
+    )
+
+
+def tooltip_table(frame, fields):
+    """Tooltips listing ``fields`` of each row, laid out like GeoJsonTooltip."""
+    return [
+        "<table>"
+        + "".join(
+            f"<tr><th>{html.escape(field)}</th><td>{html.escape(str(value))}</td></tr>"
+            for field, value in zip(fields, values)
+        )
+        + "</table>"
+        for values in zip(*(frame[field] for field in fields))
+    ]
+
+
+def neighbor_lines(lats, lons, names, neighbors, near_km=NEAR_KM, name=None):
+    """Lines from each scheme to its neighbors.
+
+    ``neighbors`` is the long table from ``proximity.compute_neighbors``;
+    its ``scheme_id``/``neighbor_id`` index ``lats``, ``lons`` and ``names``.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    names = np.asarray(names).astype(str)
+    a = neighbors["scheme_id"].to_numpy()
+    b = neighbors["neighbor_id"].to_numpy()
+    distance = neighbors["distance_km"].to_numpy(dtype=float)
+    lines = shapely.linestrings(
+        np.column_stack((lons[a], lats[a], lons[b], lats[b])).reshape(-1, 2, 2)
+    )
+    styles = [{"color": "green", "weight": 2}, {"color": "orange", "weight": 2}]
+    tooltips = [
+        f"{names[i]} ↔ {names[j]}: {round(d, 2)} km" for i, j, d in zip(a, b, distance)
+    ]
+    return EncodedLayer(
+        "line", lines, styles, (distance >= near_km).astype(int), tooltips, name=name
+    )
@@ -0,0 +1,275 @@
+import sys
+import folium
+import numpy as np
+from cache import cached
+from ingest import HYDRO_FILE, PLACES_FILE, PLACES_PARQUET, read_feature_collection
+from map_layers import marker_layer, neighbor_lines, point_layer
+from proximity import SCHEME_FIELDS, compute_neighbors, load_places
+from render_cache import render_map
+from reproject import reproject, scheme_locations
+from road_tiles import TILE_URL, tile_layer
+from tracing import span
+
+# The folium maps of the pages, built from their inputs alone so the same
+# map can be pre-rendered from the command line and served from the render
+# cache by the page. Each *_html function returns the map's HTML, building
+# it only when its inputs changed.
+SCHEMES_HTML = "malawi_hydropower_schemes.html"
+PROXIMITY_HTML = "malawi_hydropower_proximity_schemes.html"
+PLACES_HTML = "malawi_places_map.html"
+ROAD_NETWORK_HTML = "malawi_road_network.html"
+ROADS_HTML = "malawi_roads_map.html"
+FRONTEND_HTML = "map.html"
+
+# A change to the code that builds the maps is an input change too
+CODE_FILES = [
+    sys.modules[module].__file__
+    for module in (
+        __name__,
+        "map_layers",
+        "proximity",
+        "proximity_index",
+        "reproject",
+        "road_tiles",
+    )
+]
+
+ROAD_COLORS = {
+    "primary": "#FF4500",  # Orange Red
+    "secondary": "#FFD700",  # Gold
+    "tertiary": "#1E90FF",  # Dodger Blue
+}
+
+ROAD_LEGEND = """
+     <div style="position: fixed;
+     bottom: 50px; left: 50px; width: 120px; height: 90px;
+     border:2px solid grey; z-index:9999; font-size:14px;
+     background-color:white;
+     ">
+     &nbsp; Road Types <br>
+     &nbsp; <i class="fa fa-road" style="color:blue"></i> Tertiary <br>
+     &nbsp; <i class="fa fa-road" style="color:gold"></i> Secondary <br>
+     &nbsp; <i class="fa fa-road" style="color:red"></i> Primary <br>
+     </div>
+     """
+
+FRONTEND_STATUS_COLORS = {
+    "Operational": "green",
+    "Under Construction": "orange",
+    "Planned": "blue",
+    "Decommissioned": "red",
+}
+
+
+def scheme_popups(schemes):
+    return "Scheme Name: " + schemes["scheme_name"] + "<br>Status: " + schemes["status"]
+
+
+def scheme_map():
+    """Every scheme as one clustered marker layer (pages/map.py)."""
+    schemes = scheme_locations()
+    m = folium.Map(location=[-13.5, 34], zoom_start=7)
+    point_layer(
+        schemes["lat"],
+        schemes["lon"],
+        scheme_popups(schemes),
+        np.where(schemes["status"] == "Proposed", "red", "blue"),
+    ).add_to(m)
+    return m
+
+
+def proximity_map():
+    """Schemes with neighbors and the lines to them (pages/proximity_map.py)."""
+    m = folium.Map(location=[-13.5, 34], zoom_start=7)
+
+    # Scheme coordinates, and their nearest neighbors by row position in them
+    schemes = scheme_locations()
+    neighbors = compute_neighbors(schemes[SCHEME_FIELDS])
+
+    # Add a marker for every scheme that has neighbors
+    with_neighbors = schemes.iloc[neighbors["scheme_id"].unique()]
+    marker_layer(
+        with_neighbors["lat"],
+        with_neighbors["lon"],
+        np.where(with_neighbors["status"] == "Proposed", "red", "blue"),
+        scheme_popups(with_neighbors),
+    ).add_to(m)
+
+    neighbor_lines(
+        schemes["lat"], schemes["lon"], schemes["scheme_name"], neighbors
+    ).add_to(m)
+    return m
+
+
+def places_map():
+    """Gazetteer places colored by class (pages/places.py)."""
+    places = load_places()
+    m = folium.Map(location=[-13.9826, 33.773762], zoom_start=7)
+
+    # Markers are built in the browser from one array; color is based on class
+    colors = np.select(
+        [places["CLASS"] == 1, places["CLASS"] <= 3], ["red", "blue"], default="green"
+    )
+    point_layer(
+        places["LATITUDE"], places["LONGITUDE"], places["NAME"], colors, tooltip=True
+    ).add_to(m)
+    return m
+
+
+def road_network_map(schemes, neighbors, tileset="major_roads", colors=ROAD_COLORS):
+    """Road tiles, neighbor lines and the legend (pages/road_network.py).
+
+    The viewport layer is added by the page, since it changes with every pan.
+    """
+    m = folium.Map(location=[-13.5, 34], zoom_start=10)
+    tile_layer(tileset, colors).add_to(m)
+    # Lines to the nearest neighbors; ids are row positions in ``schemes``
+    neighbor_lines(
+        schemes["lat"], schemes["lon"], schemes["scheme_name"], neighbors
+    ).add_to(m)
+    m.get_root().html.add_child(folium.Element(ROAD_LEGEND))
+    return m
+
+
+def roads_map(tileset="all_roads"):
+    """Every road class as vector tiles (pages/roads.py)."""
+    m = folium.Map(location=[-13.5, 34], zoom_start=6)
+    tile_layer(tileset, {}, default_color="blue").add_to(m)
+    return m
+
+
+# Load hydropower data. The parsed table and its WGS84 coordinates are kept
+# in the shared cache, so filter changes do not re-read hydro.json
+@cached(HYDRO_FILE)
+def load_hydro():
+    df = read_feature_collection(
+        HYDRO_FILE,
+        {
+            "Scheme Name": ("properties.Scheme_Nam", "VARCHAR"),
+            "Status": ("properties.Status", "VARCHAR"),
+            "Longitude": ("geometry.coordinates[1]", "DOUBLE"),
+            "Latitude": ("geometry.coordinates[2]", "DOUBLE"),
+        },
+    )
+    # Scheme coordinates are UTM 36S; the map needs WGS84
+    lons, lats = reproject(df["Longitude"], df["Latitude"])
+    return df, lons, lats
+
+
+def filter_hydro(df, statuses, search):
+    return df[
+        (df["Status"].isin(statuses))
+        & (df["Scheme Name"].str.contains(search, case=False, na=False))
+    ]
+
+
+def frontend_map(statuses, search):
+    """The filtered schemes on a light base map (src/frontend.py)."""
+    df, lons, lats = load_hydro()
+    filtered_df = filter_hydro(df, statuses, search)
+    m = folium.Map(location=[-13.5, 34], zoom_start=6, tiles="CartoDB positron")
+
+    # Reprojected coordinates of the filtered rows
+    selected = df.index.isin(filtered_df.index)
+    point_layer(
+        lats[selected],
+        lons[selected],
+        "Scheme Name: "
+        + filtered_df["Scheme Name"]
+        + "<br>Status: "
+        + filtered_df["Status"],
+        filtered_df["Status"].map(FRONTEND_STATUS_COLORS).fillna("gray"),
+    ).add_to(m)
+    return m
+
+
+def scheme_html(force=False):
+    return render_map(
+        "schemes", scheme_map, [HYDRO_FILE, *CODE_FILES], path=SCHEMES_HTML, force=force
+    )
+
+
+def proximity_html(force=False):
+    return render_map(
+        "proximity",
+        proximity_map,
+        [HYDRO_FILE, *CODE_FILES],
+        path=PROXIMITY_HTML,
+        force=force,
+    )
+
+
+def places_html(force=False):
+    return render_map(
+        "places",
+        places_map,
+        [PLACES_PARQUET, PLACES_FILE, *CODE_FILES],
+        path=PLACES_HTML,
+        force=force,
+    )
+
+
+def road_network_html(build=None, tileset="major_roads", force=False):
+    """The road network map; ``build`` reuses a map the page already built."""
+    if build is None:
+
+        def build():
+            schemes = scheme_locations()
+            return road_network_map(
+                schemes, compute_neighbors(schemes[SCHEME_FIELDS]), tileset
+            )
+
+    return render_map(
+        "road_network",
+        build,
+        [HYDRO_FILE, *CODE_FILES],
+        {"tileset": tileset, "tiles": TILE_URL, "colors": ROAD_COLORS},
+        path=ROAD_NETWORK_HTML,
+        force=force,
+    )
+
+
+def roads_html(tileset="all_roads", force=False):
+    return render_map(
+        "roads",
+        lambda: roads_map(tileset),
+        CODE_FILES,
+        {"tileset": tileset, "tiles": TILE_URL},
+        path=ROADS_HTML,
+        force=force,
+    )
+
+
+def frontend_html(statuses=None, search="", force=False):
+    """The frontend map for a filter; all statuses by default.
+
+    Only the unfiltered map is stored and published. Filtered views (any
+    status subset, any search text) are rendered in memory on every call,
+    so free-text searches do not pile up in the render cache.
+    """
+    all_statuses = sorted(load_hydro()[0]["Status"].unique())
+    statuses = all_statuses if statuses is None else sorted(statuses)
+    if statuses != all_statuses or search:
+        with span("render frontend (filtered)") as traced:
+            html = frontend_map(statuses, search).get_root().render()
+            traced.add(html_bytes=len(html.encode()))
+        return html
+    return render_map(
+        "frontend",
+        lambda: frontend_map(statuses, search),
+        [HYDRO_FILE, *CODE_FILES],
+        {"statuses": statuses, "search": search},
+        path=FRONTEND_HTML,
+        force=force,
+    )
+
+
+# Name -> render function, for pre-rendering every map from the command line
+RENDERS = {
+    "schemes": scheme_html,
+    "proximity": proximity_html,
+    "places": places_html,
+    "road_network": road_network_html,
+    "roads": roads_html,
+    "frontend": frontend_html,
+}
@@ -1,71 +1,138 @@
-import json
 import os
-import geopandas as gpd
 import folium
-from pyproj import Proj, transformer
+import numpy as np
 import streamlit as st
 from streamlit_folium import st_folium
 from branca.colormap import LinearColormap
+from buffers import buffer_layer
+from cache import cache_panel
+from graph_cache import ensure_graph, graph_metrics, load_graph
+from map_layers import point_layer
+from maps import road_network_html, road_network_map
+from pipeline import Pipeline, Stage
 from proximity import (
-    proximity_results,
-    buffer_proximity_results,
-    status_proximity_results,
+    SCHEME_FIELDS,
+    compute_buffers,
+    compute_neighbors,
+    compute_proximity,
+    compute_road_coverage,
+    load_towns,
+    status_proximity,
 )
-import networkx as nx
-import time
-import shapely.wkt
+from reproject import scheme_locations
+from road_data import MAJOR_HIGHWAYS, MALAWI_BBOX, cached_roads, roads_path
+from road_tiles import ensure_tile_server, ensure_tiles, source_key
+from routing import Router, scheme_road_access, scheme_town_matrix
+from tracing import performance_panel, span, start_page
+from viewport import query_viewport, viewport_from_state
 import duckdb
 
+start_page("road_network")
+
 # Verify HYDRO file exists
 hydro_file = "hydro.json"
 if not os.path.exists(hydro_file):
     raise FileNotFoundError(f"HYDRO file not found at {hydro_file}")
 
+# Every cache/file key the stages below need
+roads_key = source_key(roads_path(), MAJOR_HIGHWAYS, MALAWI_BBOX)
+
+
+def build_tiles(major_roads):
+    # Pre-cut vector tiles, only rebuilt when the road file or filter changes
+    return ensure_tiles("major_roads", roads_key, lambda: major_roads)
+
+
+def build_graph_dir(major_roads):
+    # Network graph of the road vertices, weighted by segment length. It is
+    # built once per road file and highway filter and memory-mapped from disk
+    # after that; graph.to_networkx() gives a networkx view when one is needed
+    return ensure_graph(roads_key, lambda: major_roads)
+
+
+# The page's computations as stages; independent ones run at the same time,
+# e.g. the graph is built while the proximity tables are computed
+pipeline = Pipeline(
+    [
+        # Only the primary, secondary and tertiary roads; the class filter and
+        # column list are applied while the file is read, and the result is
+        # kept in the shared cache until the road file changes
+        Stage("roads", lambda: cached_roads(MAJOR_HIGHWAYS, MALAWI_BBOX)),
+        # Scheme locations, reprojected to WGS84 once and shared with other pages
+        Stage("schemes", scheme_locations),
+        Stage("towns", load_towns),
+        Stage("tiles", build_tiles, "roads"),
+        Stage("graph_dir", build_graph_dir, "roads"),
+        Stage("graph", load_graph, "graph_dir"),
+        Stage("metrics", graph_metrics, "graph_dir"),
+        Stage("router", Router, "graph"),
+        Stage(
+            "access",
+            lambda router, schemes, roads, towns: scheme_road_access(
+                router, schemes, roads["highway"], towns
+            ),
+            "router",
+            "schemes",
+            "roads",
+            "towns",
+        ),
+        Stage(
+            "town_matrix",
+            lambda router, schemes, towns: (
+                scheme_town_matrix(router, schemes, towns) if len(towns) else None
+            ),
+            "router",
+            "schemes",
+            "towns",
+        ),
+        Stage("coverage", compute_road_coverage),
+        Stage("proximity", compute_proximity),
+        Stage("buffers", compute_buffers),
+        Stage("status_proximity", status_proximity),
+        Stage(
+            "neighbors",
+            lambda schemes: compute_neighbors(schemes[SCHEME_FIELDS]),
+            "schemes",
+        ),
+    ]
+)
+
 with st.spinner("Loading Road and Hydro Station Data"):
-    print("Load data")
-    start = time.time()
-    # Load the data
-    gdf = gpd.read_file("hotosm_mwi_roads_lines_geojson.geojson")
-    # Load the geojson data
-    with open("hydro.json") as f:
-        hydro_data = json.load(f)
-    end = time.time()
-    print(end - start)
-    print("Data Loaded")
-
-
-# Define the projection of the input coordinates (EPSG:22236)
-input_proj = Proj(init="epsg:22236")
-
-# Define the output projection (WGS84)
-output_proj = Proj(init="epsg:4326")
-
-# Filter out roads of type 'path'
-print("Filter data")
-start = time.time()
-major_roads = gdf[gdf["highway"].isin(["primary", "secondary", "tertiary"])]
-end = time.time()
-print(end - start)
-print("Data filtered")
-
-# Create a network graph
-G = nx.Graph()
-for idx, road in major_roads.iterrows():
-    coords = road.geometry.coords
-    for i in range(len(coords) - 1):
-        G.add_edge(tuple(coords[i]), tuple(coords[i + 1]))
-
-# Network metrics
+    results = pipeline.run()
+
+major_roads = results["roads"]
+schemes = results["schemes"]
+
+# Network metrics, stored next to the graph
+metrics = results["metrics"]
 st.header("Road Network Metrics")
-"Total nodes:", G.number_of_nodes()
-"Total edges:", G.number_of_edges()
-"Network density:", nx.density(G)
+"Total nodes:", metrics["nodes"]
+"Total edges:", metrics["edges"]
+"Network density:", metrics["density"]
+
+# Road distances from each scheme to the trunk roads and to the towns
+st.header("Road Access")
+"Distance by road to the nearest primary/secondary road and town:"
+results["access"]
+if results["town_matrix"] is not None:
+    "Scheme to town road distance (km):"
+    results["town_matrix"]
+
+# Road length by class around each scheme
+st.header("Road Coverage")
+"Road length (km) within each radius and distance to the nearest road:"
+results["coverage"]
 
 # Basic network statistics
 st.header("Basic Road Network Statistics")
 "Total road segments:", len(major_roads)
 "Road type distribution:", major_roads["highway"].value_counts()
 
+proximity_results = results["proximity"]
+# The buffer polygons are not shown in the table
+buffer_proximity_results = results["buffers"].drop(columns="geometry")
+status_proximity_results = results["status_proximity"]
+
 "Proximity Analysis for Individual Schemes:"
 proximity_results
 
@@ -75,6 +142,9 @@ buffer_proximity_results
 "Status-based Proximity Analysis:"
 status_proximity_results
 
+with st.expander("Pipeline timings"):
+    st.dataframe(pipeline.timing_table(), hide_index=True)
+
 
 # Calculate road segment lengths
 # st.header("Road Segment length")
@@ -98,7 +168,6 @@ status_proximity_results
 # center_lat = gdf.geometry.centroid.y.mean()
 # center_lon = gdf.geometry.centroid.x.mean()
 # road_map = folium.Map(location=[center_lat, center_lon], zoom_start=10)
-road_map = folium.Map(location=[-13.5, 34], zoom_start=10)
 
 # Create a color mapping for road types
 # road_types = gdf["highway"].unique()
@@ -109,198 +178,58 @@ road_map = folium.Map(location=[-13.5, 34], zoom_start=10)
 # }
 
 
-def add_hydro_stations_to_map(road_map, hydro_data):
-    for feature in hydro_data["features"]:
-        coords = feature["geometry"]["coordinates"]
-        lon, lat = transformer.transform(input_proj, output_proj, coords[0], coords[1])
-        properties = feature["properties"]
-        if properties["Status"] == "Proposed":
-            folium.Marker(
-                location=[lat, lon],  # Note: coordinates are [longitude, latitude]
-                popup=f"Scheme Name: {properties['Scheme_Nam']}<br>Status: {properties['Status']}",
-                icon=folium.Icon(color="red"),
-            ).add_to(road_map)
-            continue
-        folium.Marker(
-            location=[lat, lon],  # Note: coordinates are [longitude, latitude]
-            popup=f"Scheme Name: {properties['Scheme_Nam']}<br>Status: {properties['Status']}",
-            icon=folium.Icon(color="blue"),
-        ).add_to(road_map)
-    return road_map
-
-
-def add_proximity_results(m):
-    scheme_locations = {}
-    for feature in hydro_data["features"]:
-        coords = feature["geometry"]["coordinates"]
-        lon, lat = transformer.transform(input_proj, output_proj, coords[0], coords[1])
-        properties = feature["properties"]
-        scheme_locations[properties["Scheme_Nam"]] = {
-            "lat": lat,
-            "lon": lon,
-            "status": properties["Status"],
-        }
-
-    for _, row in proximity_results.iterrows():
-        scheme1 = row["scheme1"]
-        neighbors = row["nearest_neighbors"]
-
-        # Add marker for the primary scheme
-        loc1 = scheme_locations[scheme1]
-        # popup_info = (
-        #     f"Scheme Name: {properties['Scheme_Nam']}<br>Status: {properties['Status']}",
-        # )
-        # folium.Marker(
-        #     location=[loc1["lat"], loc1["lon"]],
-        #     popup=popup_info,
-        #     icon=folium.Icon(color="red" if loc1["status"] == "Proposed" else "blue"),
-        # ).add_to(m)
-
-        # Add lines to nearest neighbors
-        for neighbor in neighbors.split(", "):  # Split by neighbor entries
-            try:
-                neighbor_name, distance = neighbor.split(": ")
-                distance = float(distance.split(" km")[0])
-                loc2 = scheme_locations[
-                    neighbor_name.split(" (")[0]
-                ]  # Extract scheme name
-
-                # Add line for proximity
-                folium.PolyLine(
-                    locations=[[loc1["lat"], loc1["lon"]], [loc2["lat"], loc2["lon"]]],
-                    color="green" if distance < 50 else "orange",
-                    weight=2,
-                    tooltip=f"{scheme1} ↔ {neighbor_name}: {distance} km",
-                ).add_to(m)
-            except Exception as e:
-                print(f"Error processing neighbor {neighbor}: {e}")
-    return m
-
-
-def add_buffer_results(m, buffer_results):
-    # Dictionary to store scheme locations
-    scheme_locations = {}
-
-    # Populate scheme locations from hydro_data
-    for feature in hydro_data["features"]:
-        coords = feature["geometry"]["coordinates"]
-        lon, lat = transformer.transform(input_proj, output_proj, coords[0], coords[1])
-        properties = feature["properties"]
-        scheme_name = properties["Scheme_Nam"]
-        scheme_locations[scheme_name] = {
-            "lat": lat,
-            "lon": lon,
-            "status": properties["Status"],
-        }
-
-    # Process buffer query results
-    for _, row in buffer_results.iterrows():
-        scheme_name = row["scheme_name"]
-
-        # Retrieve scheme location
-        if scheme_name in scheme_locations:
-            loc = scheme_locations[scheme_name]
-
-            # Create a marker for the scheme
-            marker_color = "red" if loc["status"] == "Proposed" else "blue"
-            folium.Marker(
-                location=[loc["lat"], loc["lon"]],
-                popup=f"Scheme: {scheme_name}<br>Status: {loc['status']}",
-                icon=folium.Icon(color=marker_color),
-            ).add_to(m)
-
-            # Parse and add buffer geometry
-            try:
-                # Assuming ST_AsText returns WKT format
-                buffer_wkt = row["buffer_geometry"]
-
-                buffer_geom = shapely.wkt.loads(buffer_wkt)
-
-                # Convert to GeoJSON
-                buffer_geojson = {
-                    "type": "Feature",
-                    "geometry": {
-                        "type": buffer_geom.geom_type,
-                        "coordinates": list(buffer_geom.exterior.coords),
-                    },
-                    "properties": {"name": scheme_name},
-                }
-
-                # Create buffer on the map
-                folium.GeoJson(
-                    buffer_geojson,
-                    style_function=lambda x: {
-                        "fillColor": "green",
-                        "color": "green",
-                        "weight": 2,
-                        "fillOpacity": 0.1,
-                    },
-                    tooltip=f"10km Buffer for {scheme_name}",
-                ).add_to(m)
-
-            except Exception as e:
-                print(f"Error processing buffer for {scheme_name}: {e}")
-
-    return m
-
-
-# Function to add roads to the map
-def add_roads_to_map(road_map, gdf, color_dict):
-    print("Roads")
-    start = time.time()
-    count = 0
-    for idx, road in gdf.iterrows():
-        # Extract coordinates
-        coords = list(road.geometry.coords)
-
-        # Choose color based on highway type
-        road_type = road["highway"]
-        color = color_dict.get(road_type, "red")  # Default to red if type not in dict
-        count += 1
-        # Add the road segment to the map
-        folium.PolyLine(
-            locations=[(lat, lon) for lon, lat in coords],
-            color=color,
-            weight=2,
-            opacity=0.7,
-            popup=f"Road Type: {road_type}, OSM ID: {road['osm_id']}",
-        ).add_to(road_map)
-    end = time.time()
-    print(end - start)
-    print("Roads loaded")
-    print(count)
-    return road_map
-
-
-color_dict = {
-    "primary": "#FF4500",  # Orange Red
-    "secondary": "#FFD700",  # Gold
-    "tertiary": "#1E90FF",  # Dodger Blue
-}
+def viewport_layer(map_state):
+    """Schemes, towns and buffers inside the area the map last showed.
+
+    Rebuilt on every rerun from the bounds and zoom ``st_folium`` returned,
+    so only what is visible is sent to the browser.
+    """
+    bbox, zoom = viewport_from_state(map_state, default_zoom=10)
+    visible = query_viewport(bbox, zoom, layers=("schemes", "places", "buffers"))
+    group = folium.FeatureGroup(name="In view")
+
+    if len(visible["buffers"]):
+        buffer_layer(visible["buffers"]).add_to(group)
+
+    places = visible["places"]
+    if len(places):
+        point_layer(
+            places["LATITUDE"],
+            places["LONGITUDE"],
+            places["NAME"],
+            ["green"] * len(places),
+            tooltip=True,
+        ).add_to(group)
+
+    in_view = visible["schemes"]
+    point_layer(
+        in_view["lat"],
+        in_view["lon"],
+        "Scheme Name: " + in_view["scheme_name"] + "<br>Status: " + in_view["status"],
+        np.where(in_view["status"] == "Proposed", "red", "blue"),
+    ).add_to(group)
+    return group
+
 
 st.header("Road")
-# Add roads to the map
 with st.spinner("Cooking..."):
-    road_map = add_roads_to_map(road_map, major_roads, color_dict)
-    road_map = add_hydro_stations_to_map(road_map, hydro_data)
-    road_map = add_proximity_results(road_map)
-    # road_map = add_buffer_results(road_map, buffer_proximity_results)
-    st_folium(road_map, width=756)
-
-# Add a legend (optional)
-legend_html = """
-     <div style="position: fixed; 
-     bottom: 50px; left: 50px; width: 120px; height: 90px; 
-     border:2px solid grey; z-index:9999; font-size:14px;
-     background-color:white;
-     ">
-     &nbsp; Road Types <br>
-     &nbsp; <i class="fa fa-road" style="color:blue"></i> Tertiary <br>
-     &nbsp; <i class="fa fa-road" style="color:gold"></i> Secondary <br>
-     &nbsp; <i class="fa fa-road" style="color:red"></i> Primary <br>
-     </div>
-     """
-road_map.get_root().html.add_child(folium.Element(legend_html))
-
-# Save the map
-road_map.save("malawi_road_network.html")
+    # Roads as the pre-cut vector tiles built (or found current) by the
+    # "tiles" stage, the nearest-neighbor lines and the legend
+    ensure_tile_server()
+    road_map = road_network_map(schemes, results["neighbors"])
+    # Written to malawi_road_network.html only when hydro.json changed
+    road_network_html(lambda: road_map)
+    # Schemes, towns and buffers follow the viewport; the roads are tiles,
+    # which the browser already only requests for the visible area
+    in_view = viewport_layer(st.session_state.get("road_network_map"))
+    with span("st_folium"):
+        st_folium(
+            road_map,
+            width=756,
+            key="road_network_map",
+            feature_group_to_add=in_view,
+            returned_objects=["bounds", "zoom"],
+        )
+
+cache_panel()
+performance_panel()
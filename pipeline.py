@@ -0,0 +1,88 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import pandas as pd
+from tracing import span
+
+# A small dependency-driven runner for page computations. Stages whose inputs
+# are ready run at the same time on a thread pool: the heavy steps (pyogrio
+# reads, shapely, NumPy, scipy and DuckDB) release the GIL, and results stay
+# in this process, so large frames and the memory-mapped graph are handed to
+# the next stage without being copied or serialized.
+PIPELINE_WORKERS = 4
+
+
+class Stage:
+    """A named step; ``func`` is called with the results of ``deps`` in order."""
+
+    def __init__(self, name, func, *deps):
+        self.name = name
+        self.func = func
+        self.deps = deps
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown {missing}")
+        self.timings = []
+
+    def run(self, workers=PIPELINE_WORKERS):
+        """Run every stage once its dependencies are done; returns
+        ``{stage name: result}``. The first stage error is re-raised."""
+        results = {}
+        self.timings = []
+        pending = dict(self.stages)
+        origin = time.perf_counter()
+
+        def timed(stage):
+            start = time.perf_counter()
+            with span(stage.name) as traced:
+                result = traced.add_rows(
+                    stage.func(*(results[dep] for dep in stage.deps))
+                )
+            end = time.perf_counter()
+            self.timings.append(
+                {
+                    "stage": stage.name,
+                    "start_s": start - origin,
+                    "wall_s": end - start,
+                    "depends_on": ", ".join(stage.deps),
+                }
+            )
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while pending or running:
+                ready = [
+                    stage
+                    for stage in pending.values()
+                    if all(dep in results for dep in stage.deps)
+                ]
+                for stage in ready:
+                    del pending[stage.name]
+                    # Stages run in the caller's tracing context, so their
+                    # spans belong to the page that started the run
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, timed, stage)] = stage.name
+                if not running:
+                    raise ValueError(f"Dependency cycle among {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        return results
+
+    def timing_table(self):
+        """Wall-clock seconds per stage of the last run, in start order."""
+        return (
+            pd.DataFrame(
+                self.timings, columns=["stage", "start_s", "wall_s", "depends_on"]
+            )
+            .sort_values("start_s")
+            .reset_index(drop=True)
+        )
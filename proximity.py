@@ -1,163 +1,164 @@
-import json
-import duckdb
-import os
-import streamlit as st
+import pandas as pd
+import buffers
+import proximity_index
+from buffers import BUFFER_RADII_KM
+from cache import cached
+from ingest import HYDRO_FILE, PLACES_FILE, PLACES_PARQUET
+from reproject import SCHEME_CRS, WGS84, reproject
+from road_coverage import COVERAGE_RADII_KM, road_coverage
+from road_data import MAJOR_HIGHWAYS, MALAWI_BBOX, cached_roads, roads_path
+from routing import TOWN_MAX_CLASS
+from store import STORE
+from tracing import span, traced
+
+# Proximity analysis uses a KD-tree over the scheme locations, limited to the
+# k nearest schemes (and optionally a search radius) instead of every pair
+NEAREST_K = 5
+SEARCH_RADIUS_KM = None
+
+STATUS_WITHIN_KM = 50
+RESULT_LIMIT = 20
+
+SCHEME_FIELDS = ["scheme_name", "status", "longitude", "latitude"]
+PLACE_FIELDS = ["NAME", "LONGITUDE", "LATITUDE", "CLASS"]
+
+
+def get_store():
+    # This thread's cursor on the process-wide store connection
+    return STORE.cursor()
+
+
+@traced("store refresh")
+def scheme_store():
+    # A cursor on the store with the scheme table reloaded if hydro.json
+    # changed; only reached when a cached result below is being rebuilt
+    STORE.refresh(["hydropower_schemes"])
+    return STORE.cursor()
+
+
+def materialize(table, params, build):
+    # Results over the full scheme table are kept in the store, keyed by the
+    # table's version and ``params``. The schemes are fetched before the
+    # store's write lock is taken and handed to ``build(schemes)``: loading
+    # them under that lock would wait on the cache entry of load_schemes,
+    # whose builder may itself be waiting for the lock.
+    schemes = load_schemes()
+    with span(f"store {table}") as stored:
+        return stored.add_rows(
+            STORE.materialize(
+                table, ["hydropower_schemes"], params, lambda: build(schemes)
+            )
+        )
+
+
+@cached(HYDRO_FILE)
+def load_schemes():
+    con = scheme_store()
+    return con.execute(
+        f"SELECT {', '.join(SCHEME_FIELDS)} FROM hydropower_schemes"
+    ).fetchdf()
+
+
+@cached(PLACES_PARQUET, PLACES_FILE)
+def load_places():
+    """Gazetteer places; empty when the places file is not available."""
+    # The gazetteer is only reloaded into the store when its file changed
+    if STORE.refresh(["malawi_places"])["malawi_places"] == "missing":
+        return pd.DataFrame(columns=PLACE_FIELDS)
+    return (
+        get_store()
+        .execute(f"SELECT {', '.join(PLACE_FIELDS)} FROM malawi_places")
+        .fetchdf()
+    )
+
 
-st.header("Proximity Analysis of Hydropower Stations in Malawi")
+@cached(PLACES_PARQUET, PLACES_FILE)
+def load_towns(max_class=TOWN_MAX_CLASS):
+    """Gazetteer towns with their location in the scheme CRS as ``x``/``y``."""
+    places = load_places()
+    towns = places[places["CLASS"] <= max_class].reset_index(drop=True)
+    x, y = reproject(towns["LONGITUDE"], towns["LATITUDE"], WGS84, SCHEME_CRS)
+    return towns.assign(x=x, y=y)
 
-# Connect to an in-memory database
-con = duckdb.connect("proximity_test")
 
-# Verify extension files exist
-spatial_extension_path = "./duckdb_extensions/spatial.duckdb_extension"
-httpfs_extension_path = "./duckdb_extensions/httpfs.duckdb_extension"
+@cached(HYDRO_FILE)
+def compute_proximity(
+    schemes=None, k=NEAREST_K, radius_km=SEARCH_RADIUS_KM, limit=RESULT_LIMIT
+):
+    """Nearest-neighbor distances per scheme.
 
-# Print full paths and check file existence
-print(f"Spatial Extension Full Path: {os.path.abspath(spatial_extension_path)}")
-print(f"HTTPFS Extension Full Path: {os.path.abspath(httpfs_extension_path)}")
+    Without ``schemes`` the full scheme table is used and the result is kept
+    materialized in the store.
+    """
+    params = {"k": k, "radius_km": radius_km, "limit": limit}
+    if schemes is not None:
+        return proximity_index.scheme_proximity(schemes, **params)
+
+    return materialize(
+        "scheme_proximity_stats",
+        params,
+        lambda schemes: proximity_index.scheme_proximity(schemes, **params),
+    )
 
-if not os.path.exists(spatial_extension_path):
-    raise FileNotFoundError(f"Spatial extension not found at {spatial_extension_path}")
 
-if not os.path.exists(httpfs_extension_path):
-    raise FileNotFoundError(f"HTTPFS extension not found at {httpfs_extension_path}")
+@cached(HYDRO_FILE)
+def compute_neighbors(
+    schemes=None, k=NEAREST_K, radius_km=SEARCH_RADIUS_KM, limit=RESULT_LIMIT
+):
+    """Nearest neighbors as a long table, one row per scheme/neighbor pair.
 
-# Load spatial extension
-con.sql(f"LOAD '{spatial_extension_path}';")
-con.sql(f"LOAD '{httpfs_extension_path}';")
+    ``scheme_id``/``neighbor_id`` are row positions in ``schemes`` (or in
+    :func:`load_schemes` when it is omitted), so map pages can index their
+    coordinate arrays with them directly.
+    """
+    params = {"k": k, "radius_km": radius_km, "limit": limit}
+    if schemes is not None:
+        return proximity_index.scheme_neighbors(schemes, **params)
+
+    return materialize(
+        "scheme_neighbors",
+        params,
+        lambda schemes: proximity_index.scheme_neighbors(schemes, **params),
+    )
 
 
-# Load the GeoJSON data
-with open("hydro.json", "r") as file:
-    hydro_data = json.load(file)
+@cached(HYDRO_FILE)
+def compute_buffers(schemes=None, radii_km=BUFFER_RADII_KM, dissolve=False):
+    """Buffers of ``radii_km`` around each scheme, built in the projected
+    scheme CRS; see :func:`buffers.scheme_buffers`.
 
-# Create a table with hydropower scheme data
-con.execute(
+    Without ``schemes`` the full scheme table is used and the buffers are
+    kept materialized in the store, with WKB geometries.
     """
-CREATE TABLE IF NOT EXISTS hydropower_schemes (
-    scheme_name VARCHAR,
-    status VARCHAR,
-    longitude DOUBLE,
-    latitude DOUBLE
-)
-"""
-)
-
-
-# Insert data from the GeoJSON
-for feature in hydro_data["features"]:
-    con.execute(
-        """
-    INSERT INTO hydropower_schemes 
-    VALUES (?, ?, ?, ?)
-    """,
-        (
-            feature["properties"]["Scheme_Nam"],
-            feature["properties"]["Status"],
-            feature["geometry"]["coordinates"][0],
-            feature["geometry"]["coordinates"][1],
+    if schemes is not None:
+        return buffers.scheme_buffers(schemes, radii_km, dissolve)
+
+    stored = materialize(
+        "scheme_buffers",
+        {"radii_km": sorted(radii_km), "dissolve": dissolve},
+        lambda schemes: buffers.to_wkb(
+            buffers.scheme_buffers(schemes, radii_km, dissolve)
         ),
     )
+    return buffers.from_wkb(stored)
 
-# Proximity Analysis using ST_Distance (requires spatial extension)
-proximity_query = """
-WITH scheme_distances AS (
-    SELECT 
-        h1.scheme_name AS scheme1,
-        h2.scheme_name AS scheme2,
-        ST_Distance(
-            ST_Point(h1.longitude, h1.latitude), 
-            ST_Point(h2.longitude, h2.latitude)
-        ) / 1000.0 AS distance_km,
-        h1.status AS status1,
-        h2.status AS status2
-    FROM hydropower_schemes h1
-    CROSS JOIN hydropower_schemes h2
-    WHERE h1.scheme_name != h2.scheme_name
-)
-
-SELECT 
-    scheme1,
-    status1,
-    ROUND(MIN(distance_km), 2) AS min_distance,
-    ROUND(AVG(distance_km), 2) AS avg_distance,
-    ROUND(MAX(distance_km), 2) AS max_distance,
-    GROUP_CONCAT(
-        scheme2 || ' (' || status2 || '): ' || ROUND(distance_km, 2) || ' km', 
-        ', '
-    ) AS nearest_neighbors
-FROM scheme_distances
-GROUP BY scheme1, status1
-ORDER BY min_distance
-LIMIT 20
-"""
-# Proximity Analysis using ST_Buffer
-buffer_proximity = """
-WITH station_buffers AS (
-    SELECT 
-        scheme_name,
-        status,
-        ST_Buffer(
-            ST_Point(longitude, latitude), 
-            10000
-        ) AS buffer_zone
-    FROM hydropower_schemes
-)
-
-SELECT
-    scheme_name,
-    status,
-    ST_AsText(buffer_zone) AS buffer_geometry
-FROM station_buffers
-LIMIT 20
-"""
-
-# Status-based Proximity Analysis
-status_proximity_query = """
-WITH status_distances AS (
-    SELECT 
-        h1.status AS status1,
-        h2.status AS status2,
-        ST_Distance(
-            ST_Point(h1.longitude, h1.latitude), 
-            ST_Point(h2.longitude, h2.latitude)
-        ) / 1000.0 AS distance_km
-    FROM hydropower_schemes h1
-    CROSS JOIN hydropower_schemes h2
-    WHERE h1.status != h2.status
-)
-
-SELECT 
-    status1,
-    status2,
-    ROUND(MIN(distance_km), 2) AS min_distance,
-    ROUND(AVG(distance_km), 2) AS avg_distance,
-    ROUND(MAX(distance_km), 2) AS max_distance,
-    COUNT(*) AS total_comparisons,
-    SUM(CASE WHEN distance_km <= 50 THEN 1 ELSE 0 END) AS schemes_within_50km
-FROM status_distances
-GROUP BY status1, status2
-ORDER BY status1, status2
-"""
-
-# Execute and display results
-print("Proximity Analysis for Individual Schemes:")
-"Proximity Analysis for Individual Schemes:"
-proximity_results = con.execute(proximity_query).fetchdf()
-print(proximity_results)
-proximity_results
-
-print("Proximity Analysis for Buffer Schemes:")
-"Proximity Analysis for Buffer Schemes:"
-buffer_proximity_results = con.execute(buffer_proximity).fetch_df()
-print(buffer_proximity_results)
-buffer_proximity_results
-
-print("\n\nStatus-based Proximity Analysis:")
-"\n\nStatus-based Proximity Analysis:"
-status_proximity_results = con.execute(status_proximity_query).fetchdf()
-print(status_proximity_results)
-status_proximity_results
-
-# Close the connection
-con.close()
+
+@cached(HYDRO_FILE, roads_path)
+def compute_road_coverage(radii_km=COVERAGE_RADII_KM, highways=MAJOR_HIGHWAYS):
+    """Road km per class around each scheme and the distance to the nearest
+    road; see :func:`road_coverage.road_coverage`."""
+    roads = cached_roads(highways, MALAWI_BBOX)
+    return road_coverage(load_schemes(), roads, radii_km, highways)
+
+
+@cached(HYDRO_FILE)
+def status_proximity(schemes=None, within_km=STATUS_WITHIN_KM):
+    """Distance statistics between schemes of different statuses."""
+    if schemes is not None:
+        return proximity_index.status_proximity(schemes, within_km=within_km)
+
+    return materialize(
+        "status_proximity",
+        {"within_km": within_km},
+        lambda schemes: proximity_index.status_proximity(schemes, within_km=within_km),
+    )
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Scheme coordinates in hydro.json are projected metres (EPSG:22236), so a
+# KD-tree over the raw x/y pairs gives true planar distances without any
+# ST_Distance call per pair.
+METRES_PER_KM = 1000.0
+
+# Pairwise distances between two status groups are averaged block by block so
+# memory stays bounded no matter how many schemes are loaded
+STATUS_BLOCK_SIZE = 2048
+
+
+class SchemeIndex:
+    """KD-tree over hydropower scheme locations.
+
+    ``schemes`` needs ``scheme_name``, ``status``, ``longitude`` and
+    ``latitude`` columns, the same layout as the ``hydropower_schemes`` table.
+    """
+
+    def __init__(self, schemes):
+        self.schemes = schemes.reset_index(drop=True)
+        self.xy = self.schemes[["longitude", "latitude"]].to_numpy(dtype=float)
+        self.names = self.schemes["scheme_name"].to_numpy()
+        self.tree = cKDTree(self.xy)
+        # Schemes sharing a name never count as neighbors of each other, so ask
+        # the tree for enough extra candidates to drop them and still have k
+        self._name_repeats = (
+            int(self.schemes["scheme_name"].value_counts().max())
+            if len(self.schemes)
+            else 0
+        )
+
+    def __len__(self):
+        return len(self.schemes)
+
+    def nearest(self, k, radius_km=None):
+        """Pairs (scheme, neighbor, distance_km, rank) for the k nearest schemes."""
+        n = len(self)
+        k = min(k, n - 1)
+        if k <= 0:
+            return _empty_pairs()
+
+        upper = np.inf if radius_km is None else radius_km * METRES_PER_KM
+        candidates = min(k + self._name_repeats, n)
+        distances, indices = self.tree.query(
+            self.xy, k=candidates, distance_upper_bound=upper
+        )
+        distances = distances.reshape(n, candidates)
+        indices = indices.reshape(n, candidates)
+
+        # Missing neighbors come back as index n; mask them together with
+        # schemes of the same name (which includes the scheme itself)
+        found = indices < n
+        safe = np.where(found, indices, 0)
+        keep = found & (self.names[safe] != self.names[:, None])
+
+        # Rank the surviving candidates per row and keep the first k
+        rank = np.cumsum(keep, axis=1)
+        keep &= rank <= k
+        rows, cols = np.nonzero(keep)
+        return pd.DataFrame(
+            {
+                "scheme": rows,
+                "neighbor": indices[rows, cols],
+                "distance_km": distances[rows, cols] / METRES_PER_KM,
+                "rank": rank[rows, cols],
+            }
+        )
+
+    def within(self, radius_km):
+        """Pairs (scheme, neighbor, distance_km, rank) closer than radius_km."""
+        if len(self) < 2:
+            return _empty_pairs()
+
+        pairs = self.tree.sparse_distance_matrix(
+            self.tree, radius_km * METRES_PER_KM, output_type="ndarray"
+        )
+        pairs = pd.DataFrame(
+            {
+                "scheme": pairs["i"],
+                "neighbor": pairs["j"],
+                "distance_km": pairs["v"] / METRES_PER_KM,
+            }
+        )
+        pairs = pairs[
+            self.names[pairs["scheme"].to_numpy()]
+            != self.names[pairs["neighbor"].to_numpy()]
+        ]
+        pairs = pairs.sort_values(["scheme", "distance_km"], kind="stable")
+        pairs["rank"] = pairs.groupby("scheme").cumcount() + 1
+        return pairs.reset_index(drop=True)
+
+    def neighbors(self, k=None, radius_km=None):
+        """k nearest, all within radius_km, or both; every other scheme if neither."""
+        if k is None and radius_km is None:
+            return self.nearest(len(self) - 1)
+        if k is None:
+            return self.within(radius_km)
+        return self.nearest(k, radius_km)
+
+
+def _empty_pairs():
+    return pd.DataFrame(
+        {
+            "scheme": pd.Series(dtype="int64"),
+            "neighbor": pd.Series(dtype="int64"),
+            "distance_km": pd.Series(dtype="float64"),
+            "rank": pd.Series(dtype="int64"),
+        }
+    )
+
+
+def scheme_neighbors(schemes, k=None, radius_km=None, limit=20):
+    """Neighbors of each scheme as a long table, one row per pair.
+
+    Columns are ``scheme_id``, ``scheme1``, ``status1``, ``neighbor_id``,
+    ``neighbor``, ``neighbor_status``, ``distance_km`` and ``rank``; the ids
+    are row positions in ``schemes``. Only the ``limit`` schemes with the
+    closest neighbor are kept, in that order, each with its neighbors by rank.
+    """
+    index = SchemeIndex(schemes)
+    pairs = index.neighbors(k=k, radius_km=radius_km)
+    names = index.schemes["scheme_name"].to_numpy()
+    statuses = index.schemes["status"].to_numpy()
+
+    scheme_id = pairs["scheme"].to_numpy()
+    neighbor_id = pairs["neighbor"].to_numpy()
+    neighbors = pd.DataFrame(
+        {
+            "scheme_id": scheme_id,
+            "scheme1": names[scheme_id],
+            "status1": statuses[scheme_id],
+            "neighbor_id": neighbor_id,
+            "neighbor": names[neighbor_id],
+            "neighbor_status": statuses[neighbor_id],
+            "distance_km": pairs["distance_km"].to_numpy(),
+            "rank": pairs["rank"].to_numpy(),
+        }
+    )
+
+    # Schemes ordered by their closest neighbor, as in the summary table
+    closest = neighbors.groupby("scheme_id", sort=False)["distance_km"].min()
+    order = closest.sort_values(kind="stable").index
+    if limit is not None:
+        order = order[:limit]
+    position = pd.Series(np.arange(len(order)), index=order)
+    neighbors = neighbors[neighbors["scheme_id"].isin(order)]
+    neighbors = neighbors.assign(_order=position[neighbors["scheme_id"]].to_numpy())
+    neighbors = neighbors.sort_values(["_order", "rank"], kind="stable")
+    return neighbors.drop(columns="_order").reset_index(drop=True)
+
+
+def scheme_proximity(schemes, k=None, radius_km=None, limit=20):
+    """Per-scheme neighbor distances in the layout of the old CROSS JOIN query.
+
+    Returns ``scheme1``, ``status1``, ``min_distance``, ``avg_distance``,
+    ``max_distance`` and ``neighbor_count``, ordered by ``min_distance``. The
+    neighbors themselves are in :func:`scheme_neighbors`.
+    """
+    neighbors = scheme_neighbors(schemes, k=k, radius_km=radius_km, limit=limit)
+    results = (
+        neighbors.groupby(["scheme_id", "scheme1", "status1"], sort=False)
+        .agg(
+            min_distance=("distance_km", "min"),
+            avg_distance=("distance_km", "mean"),
+            max_distance=("distance_km", "max"),
+            neighbor_count=("neighbor_id", "size"),
+        )
+        .reset_index()
+        .drop(columns="scheme_id")
+    )
+    results[["min_distance", "avg_distance", "max_distance"]] = results[
+        ["min_distance", "avg_distance", "max_distance"]
+    ].round(2)
+    return results
+
+
+def status_proximity(schemes, within_km=50):
+    """Distance statistics between every ordered pair of different statuses."""
+    xy = schemes[["longitude", "latitude"]].to_numpy(dtype=float)
+    statuses = schemes["status"].to_numpy()
+    groups = {status: xy[statuses == status] for status in np.unique(statuses)}
+    trees = {status: cKDTree(points) for status, points in groups.items()}
+
+    within_column = f"schemes_within_{within_km:g}km"
+    rows = []
+    for status1, points1 in groups.items():
+        for status2, points2 in groups.items():
+            if status1 == status2:
+                continue
+            # Nearest pair and the within-radius count come from the trees
+            nearest, _ = trees[status2].query(points1, k=1)
+            within = trees[status1].count_neighbors(
+                trees[status2], within_km * METRES_PER_KM
+            )
+            total, farthest = _pairwise_sum_max(points1, points2)
+            comparisons = len(points1) * len(points2)
+            rows.append(
+                {
+                    "status1": status1,
+                    "status2": status2,
+                    "min_distance": round(nearest.min() / METRES_PER_KM, 2),
+                    "avg_distance": round(total / comparisons / METRES_PER_KM, 2),
+                    "max_distance": round(farthest / METRES_PER_KM, 2),
+                    "total_comparisons": comparisons,
+                    within_column: int(within),
+                }
+            )
+
+    columns = [
+        "status1",
+        "status2",
+        "min_distance",
+        "avg_distance",
+        "max_distance",
+        "total_comparisons",
+        within_column,
+    ]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _pairwise_sum_max(points1, points2):
+    # The mean over every pair has no index shortcut, so walk it in blocks
+    total = 0.0
+    farthest = 0.0
+    for start in range(0, len(points1), STATUS_BLOCK_SIZE):
+        block = points1[start : start + STATUS_BLOCK_SIZE]
+        distances = np.hypot(
+            block[:, None, 0] - points2[None, :, 0],
+            block[:, None, 1] - points2[None, :, 1],
+        )
+        total += distances.sum()
+        farthest = max(farthest, distances.max())
+    return total, farthest
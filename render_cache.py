@@ -0,0 +1,175 @@
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import threading
+from cache import file_stamp
+from ingest import DATA_DIR
+from store import file_hash
+from tracing import span
+
+# Rendered map HTML, stored under a hash of everything that goes into it: the
+# contents of the input files, the render options and the code that builds
+# the map. A page asks for a map by its inputs and gets the stored HTML back
+# without building the folium map at all; only a change to one of the inputs
+# leads to a new render. Folium gives every element a random id, so
+# re-rendering unchanged inputs would otherwise produce a different file on
+# every run.
+RENDER_DIR = os.path.join(DATA_DIR, "renders")
+
+# Bump to invalidate every stored render, e.g. after a folium upgrade
+RENDER_VERSION = 1
+
+# Sources are keyed by their path relative to the repository, so a render
+# key does not depend on where the repository is checked out
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Appended to every render so a published file (e.g. a checked-in map in a
+# fresh clone) is recognized as current without rendering it again
+KEY_MARKER = "<!-- render key: {} -->\n"
+
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+# Keys of the renders served by this process, see used_keys()
+_used = set()
+
+
+def content_hash(path):
+    """SHA-256 of the file at ``path``, or None when it does not exist.
+
+    Hashes are remembered per (size, mtime), so an unchanged file is read
+    once per process.
+    """
+    stamp = file_stamp(path)
+    if stamp is None:
+        return None
+    with _hashes_lock:
+        known = _hashes.get(path)
+    if known is not None and known[0] == stamp:
+        return known[1]
+    digest = file_hash(path)
+    with _hashes_lock:
+        _hashes[path] = (stamp, digest)
+    return digest
+
+
+def source_name(path):
+    relative = os.path.relpath(os.path.abspath(path), REPO_DIR)
+    return relative.replace(os.sep, "/")
+
+
+def render_key(name, sources, options):
+    raw = json.dumps(
+        {
+            "name": name,
+            "version": RENDER_VERSION,
+            "sources": {source_name(path): content_hash(path) for path in sources},
+            "options": options,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def render_path(key, directory=RENDER_DIR):
+    return os.path.join(directory, f"{key}.html")
+
+
+def _tmp_path(path):
+    return f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+
+
+def _write(path, html):
+    # Written next to the target and renamed, so readers never see half a file
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp, path)
+
+
+def _copy(source, path):
+    # Same as _write: copied next to the target, then renamed over it
+    tmp = _tmp_path(path)
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, path)
+
+
+def published_key(path):
+    """Render key recorded at the end of ``path``, or None."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - 128))
+            tail = f.read().decode("utf-8", "ignore")
+    except FileNotFoundError:
+        return None
+    prefix, suffix = KEY_MARKER.split("{}")
+    start = tail.rfind(prefix)
+    if start < 0 or not tail.endswith(suffix):
+        return None
+    return tail[start + len(prefix) : -len(suffix)]
+
+
+def publish(stored, path):
+    """Copy a stored render to ``path`` unless it already holds the same HTML."""
+    if os.path.exists(path) and filecmp.cmp(stored, path, shallow=False):
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    _copy(stored, path)
+    return True
+
+
+def render_map(
+    name, build, sources=(), options=None, path=None, directory=RENDER_DIR, force=False
+):
+    """HTML of the map ``build()`` returns for these inputs.
+
+    ``sources`` are the input files and ``options`` a JSON-serializable dict
+    of everything else the map depends on; together they key the stored
+    render. ``build`` is only called when no render for the key exists (or
+    with ``force``). With ``path`` the HTML is also published there, which
+    leaves the file untouched when it is already current; a file at ``path``
+    rendered from the same key is taken over instead of rendering again.
+    """
+    key = render_key(name, sources, options or {})
+    stored = render_path(key, directory)
+    with _hashes_lock:
+        _used.add(key)
+    with span(f"render {name}") as traced:
+        if not force and not os.path.exists(stored) and path is not None:
+            if published_key(path) == key:
+                os.makedirs(directory, exist_ok=True)
+                _copy(path, stored)
+        if force or not os.path.exists(stored):
+            traced.add(cache_misses=1)
+            os.makedirs(directory, exist_ok=True)
+            _write(stored, build().get_root().render() + KEY_MARKER.format(key))
+        else:
+            traced.add(cache_hits=1)
+        with open(stored, encoding="utf-8") as f:
+            html = f.read()
+        if path is not None:
+            publish(stored, path)
+        traced.add(html_bytes=len(html.encode()))
+    return html
+
+
+def used_keys():
+    """Keys of every render served by this process so far."""
+    with _hashes_lock:
+        return set(_used)
+
+
+def clear_renders(directory=RENDER_DIR, keep=()):
+    """Delete stored renders other than ``keep`` (keys); returns how many."""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for entry in os.listdir(directory):
+        key, ext = os.path.splitext(entry)
+        if ext == ".html" and key not in keep:
+            os.remove(os.path.join(directory, entry))
+            removed += 1
+    return removed
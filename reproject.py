@@ -0,0 +1,36 @@
+from functools import lru_cache
+import numpy as np
+from pyproj import Transformer
+from cache import cached
+from ingest import HYDRO_FILE, SCHEME_COLUMNS, read_feature_collection
+
+# hydro.json is in Arc 1950 / UTM zone 36S; the maps are drawn in WGS84
+SCHEME_CRS = "EPSG:22236"
+WGS84 = "EPSG:4326"
+
+
+@lru_cache(maxsize=None)
+def get_transformer(source=SCHEME_CRS, target=WGS84):
+    # Building a Transformer is far more expensive than using one, so keep a
+    # single instance per CRS pair for the life of the process
+    return Transformer.from_crs(source, target, always_xy=True)
+
+
+def reproject(x, y, source=SCHEME_CRS, target=WGS84):
+    """Reproject whole coordinate arrays in one call. Returns (x, y) arrays,
+    i.e. (lon, lat) when the target is WGS84."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return get_transformer(source, target).transform(x, y)
+
+
+@cached(HYDRO_FILE)
+def scheme_locations(path=HYDRO_FILE):
+    """Schemes with their projected coordinates and WGS84 ``lon``/``lat``.
+
+    Computed once per process and shared by every map page; recomputed when
+    hydro.json changes.
+    """
+    schemes = read_feature_collection(path, SCHEME_COLUMNS)
+    lon, lat = reproject(schemes["longitude"], schemes["latitude"])
+    return schemes.assign(lon=lon, lat=lat)
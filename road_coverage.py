@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+from buffers import scheme_buffers
+from proximity_index import METRES_PER_KM
+from reproject import SCHEME_CRS
+from road_data import MAJOR_HIGHWAYS
+
+# Road length per class inside each scheme's catchment. Roads are taken to
+# the metric scheme CRS once; each chunk of schemes then asks an STRtree for
+# the roads whose bounding box meets its largest buffer, and only those
+# candidates are clipped against every radius. Shapely releases the GIL
+# while clipping, so chunks run in parallel on a thread pool.
+COVERAGE_RADII_KM = (5, 10, 25)
+
+# Schemes per task handed to the pool
+COVERAGE_CHUNK_SIZE = 64
+
+COVERAGE_WORKERS = min(32, os.cpu_count() or 1)
+
+
+def _chunk_lengths(tree, road_geoms, road_class, n_classes, rings):
+    # rings: list of buffer arrays for this chunk, largest radius first
+    scheme, road = tree.query(rings[0], predicate="intersects")
+    lengths = np.zeros((len(rings), len(rings[0]), n_classes))
+    for i, ring in enumerate(rings):
+        clipped = shapely.length(shapely.intersection(road_geoms[road], ring[scheme]))
+        np.add.at(lengths[i], (scheme, road_class[road]), clipped)
+    return lengths
+
+
+def road_coverage(
+    schemes,
+    roads,
+    radii_km=COVERAGE_RADII_KM,
+    classes=MAJOR_HIGHWAYS,
+    workers=COVERAGE_WORKERS,
+    chunk_size=COVERAGE_CHUNK_SIZE,
+):
+    """Per scheme: road km of each class within each radius, and the
+    straight-line distance to the nearest road.
+
+    ``schemes`` has the projected ``longitude``/``latitude`` columns of
+    ``hydropower_schemes``; ``roads`` is a GeoDataFrame with ``highway``
+    (e.g. ``major_roads``). Columns are ``{class}_within_{r}km`` plus
+    ``total_within_{r}km`` and ``nearest_road_km``.
+    """
+    roads = roads[roads["highway"].isin(classes)]
+    road_geoms = roads.to_crs(SCHEME_CRS).geometry.values
+    road_class = pd.Categorical(roads["highway"], categories=classes).codes
+    tree = shapely.STRtree(road_geoms)
+
+    radii_km = sorted(radii_km, reverse=True)
+    buffers = scheme_buffers(schemes, radii_km)
+    rings = [buffers.geometry.values[buffers["radius_km"] == r] for r in radii_km]
+
+    chunks = [
+        [ring[start : start + chunk_size] for ring in rings]
+        for start in range(0, len(schemes), chunk_size)
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(
+            pool.map(
+                lambda chunk: _chunk_lengths(
+                    tree, road_geoms, road_class, len(classes), chunk
+                ),
+                chunks,
+            )
+        )
+    lengths = (
+        np.concatenate(parts, axis=1)
+        if parts
+        else np.zeros((len(radii_km), 0, len(classes)))
+    ) / METRES_PER_KM
+
+    coverage = pd.DataFrame(
+        {
+            "scheme_name": schemes["scheme_name"].to_numpy(),
+            "status": schemes["status"].to_numpy(),
+        }
+    )
+    points = shapely.points(
+        schemes["longitude"].to_numpy(dtype=float),
+        schemes["latitude"].to_numpy(dtype=float),
+    )
+    nearest = np.full(len(points), np.inf)
+    if len(road_geoms):
+        (scheme, _), distance = tree.query_nearest(
+            points, return_distance=True, all_matches=False
+        )
+        nearest[scheme] = distance
+    coverage["nearest_road_km"] = nearest / METRES_PER_KM
+
+    for i, radius in sorted(enumerate(radii_km), key=lambda item: item[1]):
+        for j, highway in enumerate(classes):
+            coverage[f"{highway}_within_{radius:g}km"] = lengths[i, :, j]
+        coverage[f"total_within_{radius:g}km"] = lengths[i].sum(axis=1)
+    return coverage
@@ -0,0 +1,58 @@
+import os
+import geopandas as gpd
+from cache import cached
+from ingest import ROADS_FILE, ROADS_PARQUET
+
+MAJOR_HIGHWAYS = ("primary", "secondary", "tertiary")
+
+# Only the attributes the pages actually use are read from the national file
+ROAD_FIELDS = ["osm_id", "highway", "surface"]
+
+# Malawi in WGS84 (minx, miny, maxx, maxy)
+MALAWI_BBOX = (32.67, -17.13, 35.92, -9.36)
+
+
+def highway_filter(highways):
+    classes = ", ".join("'{}'".format(h.replace("'", "''")) for h in highways)
+    return f"highway IN ({classes})"
+
+
+def roads_path():
+    # The GeoParquet copy from prepare_data.py is preferred over the GeoJSON
+    return ROADS_PARQUET if os.path.exists(ROADS_PARQUET) else ROADS_FILE
+
+
+def read_roads(path=None, highways=MAJOR_HIGHWAYS, bbox=None, columns=ROAD_FIELDS):
+    """Read roads with the class filter, bbox and column list pushed into the read.
+
+    Rows outside ``highways``/``bbox`` and unused columns are dropped while
+    the file is read, so the full national network never sits in memory.
+    Pass ``highways=None`` to keep every road class. Without ``path`` the
+    GeoParquet copy is used when it exists, else the HOT OSM GeoJSON.
+    """
+    if path is None:
+        path = roads_path()
+
+    if path.endswith(".parquet"):
+        # Row groups whose bbox or highway statistics cannot match are skipped
+        return gpd.read_parquet(
+            path,
+            columns=[*columns, "geometry"],
+            bbox=bbox,
+            filters=[("highway", "in", list(highways))] if highways else None,
+        )
+
+    return gpd.read_file(
+        path,
+        engine="pyogrio",
+        columns=columns,
+        where=highway_filter(highways) if highways else None,
+        bbox=bbox,
+    )
+
+
+@cached(roads_path)
+def cached_roads(highways=MAJOR_HIGHWAYS, bbox=MALAWI_BBOX):
+    """``read_roads`` through the shared cache, reread when the road file
+    changes. The frame is shared between sessions and must not be modified."""
+    return read_roads(highways=highways, bbox=bbox)
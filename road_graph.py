@@ -0,0 +1,128 @@
+import networkx as nx
+import numpy as np
+import shapely
+from scipy import sparse
+from reproject import SCHEME_CRS, WGS84, reproject
+
+
+class RoadGraph:
+    """Undirected road graph held as NumPy arrays.
+
+    Nodes are the distinct road vertices, numbered 0..n-1, with WGS84
+    coordinates in ``node_xy`` and metric (EPSG:22236) ones in ``node_metric``.
+    Adjacency is stored in CSR form (``indptr``, ``indices``, ``weights``) with
+    both directions of every edge and segment lengths in metres as weights.
+    """
+
+    def __init__(
+        self,
+        node_xy,
+        node_metric,
+        edge_u,
+        edge_v,
+        edge_length,
+        edge_road,
+        indptr=None,
+        indices=None,
+        weights=None,
+    ):
+        self.node_xy = node_xy
+        self.node_metric = node_metric
+        self.edge_u = edge_u
+        self.edge_v = edge_v
+        self.edge_length = edge_length
+        self.edge_road = edge_road
+
+        # A graph opened from the cache brings its CSR arrays along
+        if indptr is None:
+            n = len(node_xy)
+            matrix = sparse.csr_matrix(
+                (
+                    np.concatenate([edge_length, edge_length]),
+                    (
+                        np.concatenate([edge_u, edge_v]),
+                        np.concatenate([edge_v, edge_u]),
+                    ),
+                ),
+                shape=(n, n),
+            )
+            matrix.sort_indices()
+            indptr, indices, weights = matrix.indptr, matrix.indices, matrix.data
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    def number_of_nodes(self):
+        return len(self.node_xy)
+
+    def number_of_edges(self):
+        return len(self.edge_u)
+
+    def density(self):
+        # Same definition as nx.density for an undirected graph
+        n = self.number_of_nodes()
+        return 0.0 if n <= 1 else 2 * self.number_of_edges() / (n * (n - 1))
+
+    def metrics(self):
+        return {
+            "nodes": self.number_of_nodes(),
+            "edges": self.number_of_edges(),
+            "density": self.density(),
+        }
+
+    def csr(self):
+        """Weighted adjacency as a scipy CSR matrix (shares the arrays)."""
+        n = self.number_of_nodes()
+        return sparse.csr_matrix(
+            (self.weights, self.indices, self.indptr), shape=(n, n)
+        )
+
+    def to_networkx(self):
+        """networkx view keyed by (lon, lat) tuples, like the old page-built graph."""
+        nodes = [tuple(xy) for xy in self.node_xy.tolist()]
+        G = nx.Graph()
+        G.add_weighted_edges_from(
+            zip(
+                (nodes[u] for u in self.edge_u),
+                (nodes[v] for v in self.edge_v),
+                self.edge_length.tolist(),
+            )
+        )
+        return G
+
+
+def build_graph(roads, precision=None):
+    """Build a :class:`RoadGraph` from line geometries in WGS84.
+
+    Vertices are deduplicated on their exact coordinates, or after rounding
+    to ``precision`` decimal places to snap near-coincident ones together.
+    ``edge_road`` keeps the row of ``roads`` each edge came from.
+    """
+    parts, part_road = shapely.get_parts(roads.geometry.values, return_index=True)
+    coords, part = shapely.get_coordinates(parts, return_index=True)
+    if precision is not None:
+        coords = np.round(coords, precision)
+
+    # Consecutive vertices of the same part form an edge
+    node_xy, node = np.unique(coords, axis=0, return_inverse=True)
+    node = node.ravel()
+    same_part = part[1:] == part[:-1]
+    u, v = node[:-1][same_part], node[1:][same_part]
+    road = part_road[part[:-1][same_part]]
+
+    # Drop zero-length segments and keep one copy of each undirected edge
+    keep = u != v
+    u, v, road = np.minimum(u, v)[keep], np.maximum(u, v)[keep], road[keep]
+    _, first = np.unique(np.column_stack((u, v)), axis=0, return_index=True)
+    first.sort()
+    u, v, road = u[first], v[first], road[first]
+
+    # Renumber to the nodes that are on an edge
+    used, inverse = np.unique(np.concatenate([u, v]), return_inverse=True)
+    u, v = inverse[: len(u)], inverse[len(u) :]
+    node_xy = node_xy[used]
+
+    x, y = reproject(node_xy[:, 0], node_xy[:, 1], WGS84, SCHEME_CRS)
+    node_metric = np.column_stack((x, y))
+    length = np.hypot(*(node_metric[u] - node_metric[v]).T)
+    return RoadGraph(node_xy, node_metric, u, v, length, road)
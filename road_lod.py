@@ -0,0 +1,82 @@
+import numpy as np
+import shapely
+
+# Level-of-detail pyramid for the road network. Roads are split at every
+# junction first, so each piece starts and ends on a junction; Douglas-Peucker
+# always keeps a line's end points, so simplified roads still meet exactly
+# where they met at full resolution.
+
+# Web Mercator metres per 256px tile pixel at zoom 0
+METRES_PER_PIXEL_Z0 = 2 * 20037508.342789244 / 256
+
+# Deviation allowed at each zoom, in screen pixels. Half a pixel is below
+# what Leaflet can draw, so the simplified map looks the same.
+PIXEL_TOLERANCE = 0.5
+
+# Vertices closer than this (in map units) count as the same junction
+JUNCTION_PRECISION = 1e-3
+
+
+def tolerance_for_zoom(zoom, pixel_tolerance=PIXEL_TOLERANCE):
+    """Simplification tolerance in Web Mercator metres for ``zoom``."""
+    return pixel_tolerance * METRES_PER_PIXEL_Z0 / 2**zoom
+
+
+def split_at_junctions(geometries, precision=JUNCTION_PRECISION):
+    """Split lines at every vertex shared with another line.
+
+    Returns ``(pieces, owner)`` where ``owner[i]`` is the index of the input
+    line that ``pieces[i]`` came from.
+    """
+    # Multi-part roads are split into their parts first, so no piece runs
+    # from the end of one part to the start of the next
+    parts, part_owner = shapely.get_parts(geometries, return_index=True)
+    coords, line = shapely.get_coordinates(parts, return_index=True)
+    if not len(coords):
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.int64)
+
+    # A vertex is a junction when more than one line passes through it
+    keys = np.round(coords / precision).astype(np.int64)
+    _, vertex = np.unique(keys, axis=0, return_inverse=True)
+    vertex = vertex.ravel()
+    pairs = np.unique(np.column_stack((vertex, line)), axis=0)
+    lines_per_vertex = np.bincount(pairs[:, 0], minlength=vertex.max() + 1)
+    junction = lines_per_vertex[vertex] > 1
+
+    # Interior junctions end one piece and start the next, so they are
+    # written twice; the piece id steps up right after the first copy
+    first = np.r_[True, line[1:] != line[:-1]]
+    last = np.r_[line[1:] != line[:-1], True]
+    split = junction & ~first & ~last
+    repeat = np.where(split, 2, 1)
+    coords = np.repeat(coords, repeat, axis=0)
+    line = np.repeat(line, repeat)
+
+    starts = np.repeat(first, repeat)
+    breaks = np.zeros(len(coords), dtype=bool)
+    breaks[np.cumsum(repeat)[split] - 1] = True
+    piece = np.cumsum(starts | breaks) - 1
+
+    pieces = shapely.linestrings(coords, indices=piece)
+    owner = part_owner[line[np.r_[0, np.flatnonzero(np.diff(piece)) + 1]]]
+    return pieces, owner
+
+
+def simplify_for_zoom(pieces, zoom, pixel_tolerance=PIXEL_TOLERANCE):
+    """Douglas-Peucker simplified copy of ``pieces`` for ``zoom``.
+
+    Pieces are never dropped: a run of sub-pixel pieces can still add up to
+    a visible stretch of road.
+    """
+    tolerance = tolerance_for_zoom(zoom, pixel_tolerance)
+    return shapely.simplify(pieces, tolerance, preserve_topology=True)
+
+
+def build_pyramid(geometries, zooms, pixel_tolerance=PIXEL_TOLERANCE):
+    """``{zoom: (geometries, owner)}`` for every zoom; ``owner`` maps each
+    piece back to its input line."""
+    pieces, owner = split_at_junctions(geometries)
+    return {
+        zoom: (simplify_for_zoom(pieces, zoom, pixel_tolerance), owner)
+        for zoom in zooms
+    }
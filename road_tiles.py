@@ -0,0 +1,407 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import shapely
+from branca.element import MacroElement
+from folium.plugins import VectorGridProtobuf
+from jinja2 import Template
+from reproject import get_transformer
+from road_lod import PIXEL_TOLERANCE, build_pyramid
+
+# Pre-cut Mapbox Vector Tiles for the road network, stored as MBTiles and
+# served from a small local tile endpoint. The browser then fetches only the
+# tiles for the current viewport instead of one PolyLine per road.
+TILE_DIR = "tiles"
+ROAD_LAYER = "roads"
+MIN_ZOOM = 5
+MAX_ZOOM = 13
+
+# Tile coordinates run 0..EXTENT; geometries are clipped slightly outside the
+# tile so line joins at tile edges are not visible
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# The server binds to TILE_HOST:TILE_PORT; browsers fetch tiles from
+# TILE_URL. Behind a reverse proxy or on a remote host, point ROAD_TILE_URL at
+# the public address of the tile server, e.g. a path on the app's own origin.
+TILE_HOST = os.environ.get("ROAD_TILE_HOST", "127.0.0.1")
+TILE_PORT = int(os.environ.get("ROAD_TILE_PORT", "8765"))
+TILE_URL = os.environ.get("ROAD_TILE_URL", f"http://{TILE_HOST}:{TILE_PORT}").rstrip(
+    "/"
+)
+
+WEB_MERCATOR = "EPSG:3857"
+ORIGIN_SHIFT = 20037508.342789244
+
+logger = logging.getLogger(__name__)
+
+# MVT geometry commands and feature type
+MOVE_TO = 1
+LINE_TO = 2
+LINESTRING = 2
+
+
+def source_key(path, *params):
+    # Size and mtime stand in for the contents so the key is cheap to compute
+    stat = os.stat(path)
+    raw = json.dumps(
+        [os.path.abspath(path), stat.st_size, stat.st_mtime_ns, params], default=str
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def tileset_path(name, directory=TILE_DIR):
+    return os.path.join(directory, f"{name}.mbtiles")
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number, payload):
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    return _bytes_field(number, b"".join(_varint(int(v)) for v in values))
+
+
+def _zigzag(values):
+    return (values << 1) ^ (values >> 63)
+
+
+def encode_line(points, cursor=(0, 0)):
+    """MVT command stream for one line given as integer tile coordinates.
+
+    The MVT cursor carries over between the parts of a feature, so the first
+    vertex is encoded relative to ``cursor``, where the previous part ended.
+    Returns ``(commands, cursor after the line)``, or ``(None, cursor)`` when
+    the line collapses to a single pixel.
+    """
+    # Quantization can collapse neighbouring vertices onto the same pixel
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    points = points[keep]
+    if len(points) < 2:
+        return None, cursor
+
+    start = np.asarray([cursor], dtype=np.int64)
+    deltas = np.diff(points, axis=0, prepend=start)
+    params = _zigzag(deltas.astype(np.int64))
+    commands = [(1 << 3) | MOVE_TO, *params[0]]
+    commands.append(((len(points) - 1) << 3) | LINE_TO)
+    commands.extend(params[1:].ravel())
+    return commands, tuple(int(v) for v in points[-1])
+
+
+def encode_tile(features, layer=ROAD_LAYER):
+    """Encode ``(osm_id, highway, [line, ...])`` features as one MVT layer."""
+    keys = ["highway", "osm_id"]
+    values = {}
+    encoded = []
+    for osm_id, highway, lines in features:
+        geometry = []
+        cursor = (0, 0)
+        for line in lines:
+            commands, cursor = encode_line(line, cursor)
+            if commands is not None:
+                geometry.extend(commands)
+        if not geometry:
+            continue
+
+        tags = []
+        for key_index, value in enumerate((str(highway), int(osm_id))):
+            if value not in values:
+                values[value] = len(values)
+            tags += [key_index, values[value]]
+
+        feature = _field(1, 0) + _varint(int(osm_id))
+        feature += _packed(2, tags)
+        feature += _field(3, 0) + _varint(LINESTRING)
+        feature += _packed(4, geometry)
+        encoded.append(_bytes_field(2, feature))
+
+    if not encoded:
+        return None
+
+    body = _field(15, 0) + _varint(2) + _bytes_field(1, layer.encode())
+    body += b"".join(encoded)
+    body += b"".join(_bytes_field(3, key.encode()) for key in keys)
+    for value in values:
+        if isinstance(value, str):
+            body += _bytes_field(4, _bytes_field(1, value.encode()))
+        else:
+            body += _bytes_field(4, _field(4, 0) + _varint(value))
+    body += _field(5, 0) + _varint(TILE_EXTENT)
+    return _bytes_field(3, body)
+
+
+def to_web_mercator(geometries, crs="EPSG:4326"):
+    transformer = get_transformer(crs, WEB_MERCATOR)
+    return shapely.transform(
+        geometries,
+        lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])),
+    )
+
+
+def cut_zoom(geometries, osm_ids, highways, zoom):
+    """Yield ``(x, y, tile_bytes)`` for every non-empty tile at ``zoom``."""
+    size = 2 * ORIGIN_SHIFT / 2**zoom
+    minx, miny, maxx, maxy = shapely.total_bounds(geometries)
+    xs = np.arange(
+        int((minx + ORIGIN_SHIFT) // size), int((maxx + ORIGIN_SHIFT) // size) + 1
+    )
+    ys = np.arange(
+        int((ORIGIN_SHIFT - maxy) // size), int((ORIGIN_SHIFT - miny) // size) + 1
+    )
+    tx, ty = (grid.ravel() for grid in np.meshgrid(xs, ys))
+
+    pad = size * TILE_BUFFER / TILE_EXTENT
+    left = tx * size - ORIGIN_SHIFT
+    top = ORIGIN_SHIFT - ty * size
+    boxes = shapely.box(left - pad, top - size - pad, left + size + pad, top + pad)
+
+    tree = shapely.STRtree(geometries)
+    box_index, road_index = tree.query(boxes, predicate="intersects")
+    clipped = shapely.intersection(geometries[road_index], boxes[box_index])
+
+    # Explode multi-part results and convert every vertex to tile units at once
+    parts, part_owner = shapely.get_parts(clipped, return_index=True)
+    is_line = shapely.get_type_id(parts) == 1
+    parts, part_owner = parts[is_line], part_owner[is_line]
+    coords, coord_part = shapely.get_coordinates(parts, return_index=True)
+    tile_of = box_index[part_owner][coord_part]
+    scale = TILE_EXTENT / size
+    pixels = np.column_stack(
+        ((coords[:, 0] - left[tile_of]) * scale, (top[tile_of] - coords[:, 1]) * scale)
+    )
+    pixels = np.rint(pixels).astype(np.int64)
+    bounds = np.searchsorted(coord_part, np.arange(len(parts) + 1))
+
+    order = np.argsort(box_index[part_owner], kind="stable")
+    current_tile = None
+    features = {}
+    for part in order:
+        pair = part_owner[part]
+        tile = box_index[pair]
+        if tile != current_tile:
+            if features:
+                data = encode_tile(features.values())
+                if data is not None:
+                    yield int(tx[current_tile]), int(ty[current_tile]), data
+            current_tile = tile
+            features = {}
+        # Pieces of the same road are written as one multi-line feature
+        road = road_index[pair]
+        feature = (osm_ids[road], highways[road])
+        if feature not in features:
+            features[feature] = (*feature, [])
+        features[feature][2].append(pixels[bounds[part] : bounds[part + 1]])
+
+    if features:
+        data = encode_tile(features.values())
+        if data is not None:
+            yield int(tx[current_tile]), int(ty[current_tile]), data
+
+
+def build_tiles(roads, path, key, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """Cut ``roads`` (osm_id, highway, line geometry) into an MBTiles file.
+
+    Every zoom is cut from its own level of the simplification pyramid.
+    """
+    if roads.crs is None:
+        roads = roads.set_crs("EPSG:4326")
+    geometries = to_web_mercator(roads.geometry.values, roads.crs)
+    osm_ids = roads["osm_id"].fillna(0).astype("int64").to_numpy()
+    highways = roads["highway"].astype(str).to_numpy()
+    pyramid = build_pyramid(geometries, range(min_zoom, max_zoom + 1))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = f"{path}.partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    db = sqlite3.connect(partial)
+    db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    db.execute(
+        "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)"
+    )
+    db.execute(
+        "CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)"
+    )
+
+    for zoom, (level, owner) in pyramid.items():
+        rows = (
+            (zoom, x, (1 << zoom) - 1 - y, gzip.compress(data))
+            for x, y, data in cut_zoom(level, osm_ids[owner], highways[owner], zoom)
+        )
+        db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", rows)
+
+    west, south, east, north = roads.to_crs("EPSG:4326").total_bounds
+    metadata = {
+        "name": os.path.splitext(os.path.basename(path))[0],
+        "format": "pbf",
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "bounds": f"{west},{south},{east},{north}",
+        "source_key": key,
+        "json": json.dumps(
+            {
+                "vector_layers": [
+                    {
+                        "id": ROAD_LAYER,
+                        "fields": {"highway": "String", "osm_id": "Number"},
+                        "minzoom": min_zoom,
+                        "maxzoom": max_zoom,
+                    }
+                ]
+            }
+        ),
+    }
+    db.executemany(
+        "INSERT INTO metadata VALUES (?, ?)", [(k, str(v)) for k, v in metadata.items()]
+    )
+    db.commit()
+    db.close()
+    os.replace(partial, path)
+    return path
+
+
+def tileset_metadata(path):
+    with sqlite3.connect(path) as db:
+        return dict(db.execute("SELECT name, value FROM metadata"))
+
+
+def ensure_tiles(name, key, load_roads, directory=TILE_DIR, **zooms):
+    """Build the tileset ``name`` unless one built from the same ``key`` exists.
+
+    ``load_roads`` is only called when the tiles have to be (re)built.
+    """
+    # Tiles cut with a different simplification tolerance are stale too
+    key = f"{key}:lod{PIXEL_TOLERANCE}"
+    path = tileset_path(name, directory)
+    if os.path.exists(path) and tileset_metadata(path).get("source_key") == key:
+        return path
+    return build_tiles(load_roads(), path, key, **zooms)
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    directory = TILE_DIR
+    pattern = re.compile(r"^/([\w.-]+)/(\d+)/(\d+)/(\d+)\.pbf$")
+
+    def do_GET(self):
+        match = self.pattern.match(self.path.split("?")[0])
+        path = match and tileset_path(match.group(1), self.directory)
+        if not match or not os.path.exists(path):
+            self.send_error(404)
+            return
+
+        z, x, y = (int(g) for g in match.groups()[1:])
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as db:
+            row = db.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, (1 << z) - 1 - y),
+            ).fetchone()
+
+        if row is None:
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-protobuf")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(row[0])))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "public, max-age=86400")
+        self.end_headers()
+        self.wfile.write(row[0])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tile_server(directory=TILE_DIR, host=TILE_HOST, port=TILE_PORT):
+    """Serve ``directory``/*.mbtiles at /<name>/{z}/{x}/{y}.pbf from a daemon thread."""
+    handler = type("RoadTileHandler", (TileHandler,), {"directory": directory})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def ensure_tile_server():
+    """Start the process-wide tile server once; every page shares it."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = start_tile_server()
+            except OSError as e:
+                # Another worker process already serves the tile directory
+                logger.info(
+                    "Tile server not started on %s:%s: %s", TILE_HOST, TILE_PORT, e
+                )
+                return None
+        return _server
+
+
+class _TilePopup(MacroElement):
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        {{ this._parent.get_name() }}.on('click', function(e) {
+            var p = e.layer.properties;
+            L.popup()
+                .setLatLng(e.latlng)
+                .setContent('Road Type: ' + p.highway + ', OSM ID: ' + p.osm_id)
+                .openOn({{ this._parent._parent.get_name() }});
+        });
+        {% endmacro %}
+        """
+    )
+
+
+def tile_layer(
+    name, color_dict, default_color="red", base_url=TILE_URL, max_native_zoom=MAX_ZOOM
+):
+    """A folium layer drawing the tileset ``name`` colored by highway class."""
+    url = f"{base_url}/{name}/{{z}}/{{x}}/{{y}}.pbf"
+    options = f"""{{
+        "interactive": true,
+        "maxNativeZoom": {max_native_zoom},
+        "getFeatureId": function(f) {{ return f.properties.osm_id; }},
+        "vectorTileLayerStyles": {{
+            "{ROAD_LAYER}": function(properties, zoom) {{
+                var colors = {json.dumps(color_dict)};
+                return {{
+                    "color": colors[properties.highway] || "{default_color}",
+                    "weight": 2,
+                    "opacity": 0.7
+                }};
+            }}
+        }}
+    }}"""
+    layer = VectorGridProtobuf(url, name, options)
+    layer.add_child(_TilePopup())
+    return layer
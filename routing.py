@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+from proximity_index import METRES_PER_KM
+
+# Road classes that count as the trunk network for "distance to nearest road"
+TRUNK_HIGHWAYS = ("primary", "secondary")
+
+# Gazetteer classes 1-3 are the capital, cities and towns
+TOWN_MAX_CLASS = 3
+
+# Dijkstra rows are computed this many sources at a time, so memory stays at
+# block size x node count however many schemes or towns are asked for
+ROUTE_BLOCK_SIZE = 32
+
+
+class Router:
+    """Road distances over a :class:`road_graph.RoadGraph`.
+
+    Points are given in the scheme CRS (EPSG:22236 metres) and snapped to the
+    closest graph node through a KD-tree; the straight-line hop to that node
+    is added to every distance. Distances come back in kilometres, ``inf``
+    where the road network does not connect two points.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.matrix = graph.csr()
+        self.tree = cKDTree(graph.node_metric)
+
+    def snap(self, xy):
+        """(node, offset in metres) of the closest graph node to each point."""
+        offset, node = self.tree.query(np.asarray(xy, dtype=float).reshape(-1, 2))
+        return node, offset
+
+    def road_distances(self, source_xy, target_xy):
+        """Source x target matrix of road distances in km."""
+        source, source_offset = self.snap(source_xy)
+        target, target_offset = self.snap(target_xy)
+        source_nodes, source_row = np.unique(source, return_inverse=True)
+        target_nodes, target_col = np.unique(target, return_inverse=True)
+
+        # The graph is undirected, so search from whichever side is smaller
+        if len(target_nodes) < len(source_nodes):
+            metres = self._node_distances(target_nodes, source_nodes).T
+        else:
+            metres = self._node_distances(source_nodes, target_nodes)
+
+        metres = metres[np.ix_(source_row, target_col)]
+        metres += source_offset[:, None] + target_offset[None, :]
+        return metres / METRES_PER_KM
+
+    def _node_distances(self, sources, targets):
+        out = np.empty((len(sources), len(targets)))
+        for start in range(0, len(sources), ROUTE_BLOCK_SIZE):
+            block = sources[start : start + ROUTE_BLOCK_SIZE]
+            out[start : start + len(block)] = dijkstra(self.matrix, indices=block)[
+                :, targets
+            ]
+        return out
+
+    def distance_to_nodes(self, xy, nodes):
+        """Road distance in km from each point to the closest of ``nodes``.
+
+        One multi-source Dijkstra covers every point at once.
+        """
+        point, offset = self.snap(xy)
+        if not len(nodes):
+            return np.full(len(point), np.inf)
+        metres = dijkstra(self.matrix, indices=np.asarray(nodes), min_only=True)
+        return (metres[point] + offset) / METRES_PER_KM
+
+    def class_nodes(self, highway, classes=TRUNK_HIGHWAYS):
+        """Nodes on an edge whose road is in ``classes``.
+
+        ``highway`` is the road class per row of the frame the graph was
+        built from.
+        """
+        on_class = np.isin(np.asarray(highway)[self.graph.edge_road], classes)
+        return np.unique(
+            np.concatenate([self.graph.edge_u[on_class], self.graph.edge_v[on_class]])
+        )
+
+
+def scheme_town_matrix(router, schemes, towns):
+    """Scheme x town road distances in km.
+
+    ``schemes`` carries the projected ``longitude``/``latitude`` columns of
+    ``hydropower_schemes``; ``towns`` needs ``NAME`` and projected ``x``/``y``.
+    """
+    distances = router.road_distances(
+        schemes[["longitude", "latitude"]].to_numpy(dtype=float),
+        towns[["x", "y"]].to_numpy(dtype=float),
+    )
+    return pd.DataFrame(
+        distances,
+        index=pd.Index(schemes["scheme_name"], name="scheme_name"),
+        columns=pd.Index(towns["NAME"], name="town"),
+    )
+
+
+def scheme_road_access(router, schemes, highway, towns=None, classes=TRUNK_HIGHWAYS):
+    """Per scheme: road distance to the nearest ``classes`` road and, with
+    ``towns``, to the nearest town and which town that is."""
+    xy = schemes[["longitude", "latitude"]].to_numpy(dtype=float)
+    access = pd.DataFrame(
+        {
+            "scheme_name": schemes["scheme_name"].to_numpy(),
+            "status": schemes["status"].to_numpy(),
+            "nearest_road_km": router.distance_to_nodes(
+                xy, router.class_nodes(highway, classes)
+            ),
+        }
+    )
+    if towns is not None and len(towns):
+        matrix = scheme_town_matrix(router, schemes, towns).to_numpy()
+        nearest = matrix.argmin(axis=1)
+        access["nearest_town"] = towns["NAME"].to_numpy()[nearest]
+        access["nearest_town_km"] = matrix[np.arange(len(matrix)), nearest]
+    return access
@@ -1,11 +1,15 @@
-from streamlit_folium import folium_static
-import folium
 import streamlit as st
-import json
-import pandas as pd
+import os
+import sys
 import plotly.express as px
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache import cache_panel  # noqa: E402
+from maps import filter_hydro, frontend_html, load_hydro  # noqa: E402
+from tracing import performance_panel, start_page  # noqa: E402
+
 st.set_page_config(page_title="Malawi Hydropower Map", layout="wide", page_icon=":water_wave:", initial_sidebar_state="expanded")
+start_page("frontend")
 
 st.markdown("""
     <style>
@@ -77,23 +81,9 @@ st.markdown("""
 
 st.markdown("## Explore Hydropower Locations Across Malawi", unsafe_allow_html=True)
 
-# Load hydropower data
-with open("hydro.json") as f:
-    hydro_data = json.load(f)
-
-# Prepare data for DataFrame
-data = []
-for feature in hydro_data["features"]:
-    coords = feature["geometry"]["coordinates"]
-    properties = feature["properties"]
-    data.append({
-        "Scheme Name": properties['Scheme_Nam'],
-        "Status": properties['Status'],
-        "Longitude": coords[0],
-        "Latitude": coords[1],
-    })
-# Convert data to DataFrame
-df = pd.DataFrame(data)
+# Load hydropower data. The parsed table and its WGS84 coordinates are kept
+# in the shared cache, so filter changes do not re-read hydro.json
+df, lons, lats = load_hydro()
 
 st.sidebar.title("🔍 Hydropower Scheme Filters")
 status_filter = st.sidebar.multiselect(
@@ -103,10 +93,7 @@ name_search = st.sidebar.text_input("Search by scheme name", placeholder="Enter
 
 # filter data base on user input
 
-filtered_df = df[
-    (df["Status"].isin(status_filter))&
-    (df["Scheme Name"].str.contains(name_search,case = False, na = False))
-]
+filtered_df = filter_hydro(df, status_filter, name_search)
 
 st.sidebar.download_button(
      label=" 📥 Download Filtered Data",
@@ -121,24 +108,11 @@ st.sidebar.download_button(
 st.sidebar.metric("Total Schemes", len(df))
 st.sidebar.metric("Filtered Schemes", len(filtered_df))
 st.sidebar.metric("Unique Statuses", df["Status"].nunique())
+cache_panel()
 
-m = folium.Map(location=[-13.5, 34], zoom_start=6,  tiles="CartoDB positron" )
-
-status_colors = { 'Operational': 'green','Under Construction': 'orange', 'Planned': 'blue','Decommissioned': 'red'
-}
-for _, row in filtered_df.iterrows():
-     status = row['Status']
-     color = status_colors.get(status, 'gray')
-
-     folium.Marker(
-        location=[row['Latitude'], row['Longitude']],  
-        popup=f"Scheme Name: {properties['Scheme_Nam']}<br>Status: {properties['Status']}",
-        icon=folium.Icon(color="color"),
-    ).add_to(m)
-      
-folium_static = m.save("map.html")
-# Render Folium map in Streamlit
-st.components.v1.html(m._repr_html_(), height=600)
+# The unfiltered map comes from the render cache; filtered views are
+# rendered for this request only
+st.components.v1.html(frontend_html(status_filter, name_search), height=600)
 
 # Display DataFrame
 st.subheader("📍Hydropower Scheme Coordinates")
@@ -159,8 +133,8 @@ status_counts.columns = ['Status', 'Count']
 fig_pie = px.pie(status_counts, names='Status', values='Count')
 fig_pie.update_layout(title='Distribution of Scheme Statuses')
 
-# Convert the list to a DataFrame
-data_df = pd.DataFrame(data)
+# Copy the scheme DataFrame for the charts
+data_df = df.copy()
 
 # Rename the columns
 data_df.columns = ['Scheme', 'Status', 'Longitude', 'Latitude']
@@ -179,6 +153,7 @@ data_df.columns = ['Scheme', 'Status', 'Longitude', 'Latitude']
 # Display the charts
 st.subheader("Scheme Status Distribution")
 st.plotly_chart(fig_pie, use_container_width=True)
+performance_panel()
 
 #st.subheader("Longitude by Scheme and Status")
 #col1, col2 = st.columns(2)
@@ -0,0 +1,265 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+import proximity  # noqa: E402
+import proximity_index  # noqa: E402
+from buffers import BUFFER_RADII_KM, scheme_buffers  # noqa: E402
+from ingest import DATA_DIR, HYDRO_FILE, SCHEME_COLUMNS, read_feature_collection  # noqa: E402
+from road_coverage import COVERAGE_RADII_KM, road_coverage  # noqa: E402
+from road_data import MAJOR_HIGHWAYS, MALAWI_BBOX, read_roads, roads_path  # noqa: E402
+from road_graph import build_graph  # noqa: E402
+
+# Headless runs of the dashboard analyses, e.g. from a nightly job. Every
+# combination of the given parameters is one task; tasks run in separate
+# processes, each reading its inputs itself and writing one Parquet file, so
+# nothing large crosses process boundaries.
+BATCH_DIR = os.path.join(DATA_DIR, "batch")
+MANIFEST_FILE = "manifest.json"
+
+BATCH_WORKERS = os.cpu_count() or 1
+
+ANALYSES = ("neighbors", "proximity", "buffers", "status_proximity", "road_network")
+
+
+@lru_cache(maxsize=None)
+def read_schemes(path):
+    # Read once per worker process, however many tasks it runs
+    return read_feature_collection(path, SCHEME_COLUMNS)
+
+
+@lru_cache(maxsize=4)
+def read_major_roads(path, highways):
+    return read_roads(path, highways=list(highways), bbox=MALAWI_BBOX)
+
+
+def run_neighbors(inputs, k, radius_km, limit):
+    return proximity_index.scheme_neighbors(
+        read_schemes(inputs["schemes"]), k=k, radius_km=radius_km, limit=limit
+    )
+
+
+def run_proximity(inputs, k, radius_km, limit):
+    return proximity_index.scheme_proximity(
+        read_schemes(inputs["schemes"]), k=k, radius_km=radius_km, limit=limit
+    )
+
+
+def run_buffers(inputs, radii_km, dissolve):
+    # Written as GeoParquet, still in the scheme CRS
+    return scheme_buffers(read_schemes(inputs["schemes"]), radii_km, dissolve)
+
+
+def run_status_proximity(inputs, within_km):
+    return proximity_index.status_proximity(
+        read_schemes(inputs["schemes"]), within_km=within_km
+    )
+
+
+def run_road_network(inputs, highways, coverage_radii_km):
+    """Graph metrics and per-scheme road coverage for one set of road classes;
+    the metrics are repeated on every scheme row."""
+    roads = read_major_roads(inputs["roads"], highways)
+    metrics = build_graph(roads).metrics()
+    coverage = road_coverage(
+        read_schemes(inputs["schemes"]),
+        roads,
+        coverage_radii_km,
+        highways,
+        workers=1,
+    )
+    return coverage.assign(
+        road_segments=len(roads),
+        graph_nodes=metrics["nodes"],
+        graph_edges=metrics["edges"],
+        graph_density=metrics["density"],
+    )
+
+
+RUNNERS = {
+    "neighbors": run_neighbors,
+    "proximity": run_proximity,
+    "buffers": run_buffers,
+    "status_proximity": run_status_proximity,
+    "road_network": run_road_network,
+}
+
+
+def _slug(value):
+    if isinstance(value, (list, tuple)):
+        return "+".join(_slug(v) for v in value)
+    return str(value).replace(os.sep, "_")
+
+
+def task_name(analysis, params):
+    return "-".join(
+        [analysis, *(f"{key}{_slug(value)}" for key, value in params.items())]
+    )
+
+
+def tasks_for(analyses, args):
+    """(analysis, params) for every parameter combination of each analysis."""
+    grids = {
+        "neighbors": {"k": args.k, "radius_km": args.radius_km, "limit": [args.limit]},
+        "proximity": {"k": args.k, "radius_km": args.radius_km, "limit": [args.limit]},
+        "buffers": {"radii_km": args.buffer_radii, "dissolve": [args.dissolve]},
+        "status_proximity": {"within_km": args.within_km},
+        "road_network": {
+            "highways": args.highways,
+            "coverage_radii_km": [tuple(args.coverage_radii)],
+        },
+    }
+    for analysis in analyses:
+        grid = grids[analysis]
+        for values in itertools.product(*grid.values()):
+            yield analysis, dict(zip(grid, values))
+
+
+def run_task(analysis, params, inputs, output_dir):
+    """Run one task and write its result; returns its manifest entry."""
+    start = time.perf_counter()
+    result = RUNNERS[analysis](inputs, **params)
+    # Parameters go into the table too, so outputs can be concatenated
+    for key, value in params.items():
+        result[key] = _slug(value) if isinstance(value, (list, tuple)) else value
+    path = os.path.join(output_dir, f"{task_name(analysis, params)}.parquet")
+    result.to_parquet(path, index=False)
+    return {
+        "analysis": analysis,
+        "params": params,
+        "path": path,
+        "rows": len(result),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def warm_store():
+    """Materialize the dashboard's default results in the analytics store.
+
+    This opens the store for writing, which fails while a dashboard has it
+    open; run it before starting a read-only (HYDRO_STORE_READ_ONLY=1) one.
+    """
+    proximity.compute_proximity()
+    proximity.compute_neighbors()
+    proximity.compute_buffers()
+    proximity.status_proximity()
+
+
+def _float_or_none(value):
+    return None if value.lower() == "none" else float(value)
+
+
+def _radii(value):
+    return tuple(float(r) for r in value.split(","))
+
+
+def _classes(value):
+    return tuple(h.strip() for h in value.split(",") if h.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the proximity, buffer and road network analyses and write Parquet."
+    )
+    parser.add_argument(
+        "analyses",
+        nargs="*",
+        choices=ANALYSES,
+        help="analyses to run (default: all)",
+    )
+    parser.add_argument("--schemes", default=HYDRO_FILE, help="scheme GeoJSON")
+    parser.add_argument("--roads", default=None, help="road GeoParquet or GeoJSON")
+    parser.add_argument(
+        "--output", default=BATCH_DIR, help="directory for the Parquet files"
+    )
+    parser.add_argument("--k", type=int, nargs="+", default=[proximity.NEAREST_K])
+    parser.add_argument(
+        "--radius-km",
+        type=_float_or_none,
+        nargs="+",
+        default=[proximity.SEARCH_RADIUS_KM],
+        help="neighbor search radii; 'none' for k nearest only",
+    )
+    parser.add_argument(
+        "--limit",
+        type=lambda v: None if v.lower() == "none" else int(v),
+        default=proximity.RESULT_LIMIT,
+        help="schemes kept in the neighbor tables; 'none' for all",
+    )
+    parser.add_argument(
+        "--buffer-radii",
+        type=_radii,
+        nargs="+",
+        default=[BUFFER_RADII_KM],
+        help="comma-separated buffer radii (km) per parameter set, e.g. 5,10,25",
+    )
+    parser.add_argument("--dissolve", action="store_true")
+    parser.add_argument(
+        "--within-km", type=float, nargs="+", default=[proximity.STATUS_WITHIN_KM]
+    )
+    parser.add_argument(
+        "--highways",
+        type=_classes,
+        nargs="+",
+        default=[MAJOR_HIGHWAYS],
+        help="comma-separated highway classes per parameter set, e.g. primary,secondary",
+    )
+    parser.add_argument(
+        "--coverage-radii", type=float, nargs="+", default=list(COVERAGE_RADII_KM)
+    )
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help="also materialize the default results in the analytics store "
+        "(the dashboard must not have the store open)",
+    )
+    args = parser.parse_args(argv)
+
+    inputs = {"schemes": args.schemes, "roads": args.roads or roads_path()}
+    analyses = args.analyses or list(ANALYSES)
+    if "road_network" in analyses and not os.path.exists(inputs["roads"]):
+        print(f"Skipping road_network: {inputs['roads']} not found")
+        analyses.remove("road_network")
+    os.makedirs(args.output, exist_ok=True)
+
+    tasks = list(tasks_for(analyses, args))
+    manifest, failed = [], 0
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(tasks) or 1)) as pool:
+        futures = [
+            (
+                analysis,
+                params,
+                pool.submit(run_task, analysis, params, inputs, args.output),
+            )
+            for analysis, params in tasks
+        ]
+        for analysis, params, future in futures:
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"{task_name(analysis, params)}: failed: {e}")
+                failed += 1
+                continue
+            manifest.append(entry)
+            print(f"{entry['path']}: {entry['rows']} rows in {entry['seconds']:.2f}s")
+
+    with open(os.path.join(args.output, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    if args.store:
+        warm_store()
+        print("Store results materialized")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
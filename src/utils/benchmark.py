@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import duckdb
+import folium
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import proximity_index  # noqa: E402
+from buffers import buffer_layer, scheme_buffers  # noqa: E402
+from ingest import (  # noqa: E402
+    PLACES_COLUMNS,
+    SCHEME_COLUMNS,
+    load_feature_collection,
+)
+from map_layers import neighbor_lines, point_layer  # noqa: E402
+from reproject import reproject  # noqa: E402
+from road_data import MAJOR_HIGHWAYS, MALAWI_BBOX, read_roads  # noqa: E402
+from road_graph import build_graph  # noqa: E402
+from synthetic_data import write_dataset  # noqa: E402
+
+# Stage benchmarks over a synthetic dataset, run without Streamlit. Each
+# stage records wall time, CPU time and peak Python-tracked memory (NumPy
+# buffers included; GEOS and DuckDB allocations are not visible to
+# tracemalloc). Results can be saved as a baseline and later runs fail when
+# a stage gets slower or larger than the baseline allows. The baseline is
+# checked in next to this script, one set of results per profile (e.g. per
+# machine or CI runner), so every checkout compares against the same numbers.
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+BASELINE_PROFILE = os.environ.get("HYDRO_BENCH_PROFILE", "default")
+SCALES = (10, 100, 1000)
+
+# A stage regresses when it is this fraction over the baseline and also over
+# by more than the absolute slack, so millisecond stages do not flap
+TOLERANCE = 0.5
+MIN_SLACK_S = 0.05
+MIN_SLACK_MB = 1.0
+
+
+def measure(name, func, results):
+    """Run ``func`` once and append its measurements to ``results``.
+
+    ``func`` returns ``(value, rows)`` or ``(value, rows, extra dict)``.
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+    value, rows, *extra = func()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.append(
+        {
+            "stage": name,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "peak_mb": peak / 2**20,
+            "rows": rows,
+            **(extra[0] if extra else {}),
+        }
+    )
+    return value
+
+
+def with_rows(value):
+    return value, len(value)
+
+
+def run_stages(paths):
+    results = []
+    con = duckdb.connect(":memory:")
+
+    # Ingestion
+    for table, path, columns in (
+        ("hydropower_schemes", paths["schemes"], SCHEME_COLUMNS),
+        ("malawi_places", paths["places"], PLACES_COLUMNS),
+    ):
+        measure(
+            f"ingest_{table}",
+            lambda: (None, load_feature_collection(con, table, path, columns)),
+            results,
+        )
+    schemes = con.execute(
+        "SELECT scheme_name, status, longitude, latitude FROM hydropower_schemes"
+    ).fetchdf()
+    places = con.execute(
+        "SELECT NAME, LONGITUDE, LATITUDE, CLASS FROM malawi_places"
+    ).fetchdf()
+
+    # The three proximity queries
+    proximity = measure(
+        "scheme_proximity",
+        lambda: with_rows(proximity_index.scheme_neighbors(schemes, k=5)),
+        results,
+    )
+    measure(
+        "status_proximity",
+        lambda: with_rows(proximity_index.status_proximity(schemes)),
+        results,
+    )
+    buffers = measure(
+        "buffers",
+        lambda: with_rows(scheme_buffers(schemes)),
+        results,
+    )
+
+    # Roads
+    roads = measure(
+        "road_filter",
+        lambda: with_rows(
+            read_roads(paths["roads"], highways=MAJOR_HIGHWAYS, bbox=MALAWI_BBOX)
+        ),
+        results,
+    )
+    measure(
+        "road_graph",
+        lambda: (lambda g: (g, g.number_of_edges()))(build_graph(roads)),
+        results,
+    )
+
+    # Reprojection
+    lon, lat = measure(
+        "reproject",
+        lambda: (reproject(schemes["longitude"], schemes["latitude"]), len(schemes)),
+        results,
+    )
+
+    # Map construction and HTML size
+    def render():
+        m = folium.Map(location=[-13.5, 34], zoom_start=7)
+        point_layer(
+            lat,
+            lon,
+            "Scheme Name: "
+            + schemes["scheme_name"]
+            + "<br>Status: "
+            + schemes["status"],
+            np.where(schemes["status"] == "Proposed", "red", "blue"),
+        ).add_to(m)
+        point_layer(
+            places["LATITUDE"],
+            places["LONGITUDE"],
+            places["NAME"],
+            ["green"] * len(places),
+        ).add_to(m)
+        neighbor_lines(lat, lon, schemes["scheme_name"], proximity).add_to(m)
+        buffer_layer(buffers[buffers["radius_km"] == 10]).add_to(m)
+        html = m.get_root().render()
+        return html, len(schemes) + len(places), {"html_bytes": len(html.encode())}
+
+    measure("folium_map", render, results)
+    con.close()
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Rows of ``results`` that regressed against ``baseline``."""
+    regressions = []
+    for row in results:
+        base = baseline.get(row["key"])
+        if base is None:
+            continue
+        for field, slack in (("wall_s", MIN_SLACK_S), ("peak_mb", MIN_SLACK_MB)):
+            limit = base[field] * (1 + tolerance)
+            if row[field] > limit and row[field] - base[field] > slack:
+                regressions.append(
+                    f"{row['key']}: {field} {row[field]:.3f} > {limit:.3f} "
+                    f"(baseline {base[field]:.3f})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ingestion, proximity, roads, reprojection and map rendering."
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        nargs="+",
+        default=[SCALES[0]],
+        help=f"dataset sizes as multiples of the real data (e.g. {' '.join(map(str, SCALES))})",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workdir", help="where to write the synthetic data (default: a temp dir)"
+    )
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--profile",
+        default=BASELINE_PROFILE,
+        help="baseline entry to compare with or save to (HYDRO_BENCH_PROFILE)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run as the new baseline",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scale:
+            directory = os.path.join(args.workdir or tmp, f"scale_{scale:g}")
+            paths = write_dataset(directory, scale, args.seed)
+            for row in run_stages(paths):
+                row["key"] = f"x{scale:g}:{row['stage']}"
+                results.append({"scale": scale, **row})
+
+    table = pd.DataFrame(results).drop(columns="key")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines.setdefault(args.profile, {}).update(
+            {row["key"]: row for row in results}
+        )
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline {args.profile!r} saved to {args.baseline}")
+        return 0
+
+    baseline = baselines.get(args.profile, {})
+    missing = [row["key"] for row in results if row["key"] not in baseline]
+    if missing:
+        print(
+            f"No {args.profile!r} baseline for {', '.join(missing)}; "
+            "run with --save-baseline to add it"
+        )
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
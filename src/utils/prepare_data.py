@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import time
+import geopandas as gpd
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+from ingest import (  # noqa: E402
+    DATA_DIR,
+    HYDRO_FILE,
+    PLACES_PARQUET,
+    ROADS_FILE,
+    ROADS_PARQUET,
+)
+
+# Dataset name -> (source file, GeoParquet output, CRS override). The pages
+# read the GeoParquet copies when they exist and fall back to the sources
+# otherwise. hydro.json carries UTM 36S coordinates without declaring a CRS.
+DATASETS = {
+    "roads": (ROADS_FILE, ROADS_PARQUET, None),
+    "places": ("mlwplaces_point.shp", PLACES_PARQUET, None),
+    "hydro": (HYDRO_FILE, os.path.join(DATA_DIR, "hydro.parquet"), "EPSG:22236"),
+    "wrs": (
+        "Water Resource Areas [Atkins 2012]/waterresourceareas.shp",
+        os.path.join(DATA_DIR, "wrs.parquet"),
+        None,
+    ),
+    "sln": (
+        "Stream_ Lake GeoNames/geonames_h.shp",
+        os.path.join(DATA_DIR, "sln.parquet"),
+        None,
+    ),
+    "rg": ("Rain Gauges/raingauges.shp", os.path.join(DATA_DIR, "rg.parquet"), None),
+}
+
+# Small row groups keep the per-group bounding boxes tight, so a viewport or
+# bbox read only touches a few groups of the spatially sorted file
+ROW_GROUP_SIZE = 4096
+
+
+def to_geoparquet(source, target, row_group_size=ROW_GROUP_SIZE, crs=None):
+    gdf = gpd.read_file(source, engine="pyogrio")
+    if crs is not None:
+        gdf = gdf.set_crs(crs, allow_override=True)
+
+    # Hilbert order puts features that are close on the map next to each other
+    # in the file, which is what makes row-group bbox statistics selective
+    if len(gdf):
+        gdf = gdf.iloc[gdf.hilbert_distance().argsort()].reset_index(drop=True)
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    gdf.to_parquet(
+        target,
+        compression="zstd",
+        write_covering_bbox=True,
+        row_group_size=row_group_size,
+    )
+    return len(gdf)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert the source GeoJSON and shapefiles to spatially sorted GeoParquet."
+    )
+    parser.add_argument(
+        "datasets",
+        nargs="*",
+        choices=sorted(DATASETS),
+        help="datasets to convert (default: every dataset whose source exists)",
+    )
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+    args = parser.parse_args(argv)
+
+    for name in args.datasets or DATASETS:
+        source, target, crs = DATASETS[name]
+        if not os.path.exists(source):
+            print(f"Skipping {name}: {source} not found")
+            continue
+        start = time.time()
+        rows = to_geoparquet(source, target, args.row_group_size, crs)
+        print(
+            f"{name}: {rows} features written to {target} in {time.time() - start:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+from maps import RENDERS  # noqa: E402
+from render_cache import RENDER_DIR, clear_renders, used_keys  # noqa: E402
+from tracing import span  # noqa: E402
+
+# Render every page map into the render cache ahead of time, e.g. at deploy,
+# so the first visitor is served stored HTML. Maps whose inputs did not change
+# are not rendered again and their published files are left as they are.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pre-render the page maps into the render cache."
+    )
+    parser.add_argument(
+        "maps",
+        nargs="*",
+        choices=sorted(RENDERS),
+        help="maps to render (default: all)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="render even when the inputs are unchanged"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help=f"afterwards, remove the renders in {RENDER_DIR} this run did not "
+        "use (including those of maps not listed)",
+    )
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for name in args.maps or RENDERS:
+        start = time.time()
+        try:
+            with span(f"prerender {name}") as traced:
+                html = RENDERS[name](force=args.force)
+        except Exception as e:
+            # Maps whose data is not available here are reported, not fatal
+            print(f"{name}: not rendered: {e}")
+            failed += 1
+            continue
+        rendered = any(
+            record["cache_misses"]
+            for record in traced.records
+            if record["span"] == f"render {name}"
+        )
+        state = "rendered" if rendered else "up to date"
+        print(
+            f"{name}: {state}, {len(html.encode()) / 2**10:.0f} KB "
+            f"in {time.time() - start:.2f}s"
+        )
+
+    # Pruned after rendering, once the current keys are known
+    if args.prune:
+        print(f"Removed {clear_renders(keep=used_keys())} stored renders")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import sys
+import geopandas as gpd
+import numpy as np
+import shapely
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+from reproject import SCHEME_CRS, WGS84, reproject  # noqa: E402
+from road_data import MALAWI_BBOX  # noqa: E402
+
+# Synthetic stand-ins for the project datasets, spread over Malawi's bounding
+# box, for benchmarking at sizes the real data does not reach. Scale 1 is
+# roughly the size of the real files.
+BASE_SIZES = {"schemes": 21, "places": 3000, "roads": 20000}
+
+STATUSES = ["Existing", "Proposed", "Under Construction", "Kamuzu"]
+STATUS_WEIGHTS = [0.3, 0.55, 0.1, 0.05]
+
+HIGHWAYS = ["primary", "secondary", "tertiary", "residential", "track", "path"]
+HIGHWAY_WEIGHTS = [0.05, 0.1, 0.2, 0.3, 0.2, 0.15]
+SURFACES = ["asphalt", "paved", "unpaved", "gravel", "dirt"]
+
+# Road shape: vertices per road and the step between them in degrees
+ROAD_VERTICES = (4, 24)
+ROAD_STEP_DEG = 0.005
+
+
+def sizes_for_scale(scale):
+    return {name: max(1, int(size * scale)) for name, size in BASE_SIZES.items()}
+
+
+def random_lonlat(rng, n):
+    minx, miny, maxx, maxy = MALAWI_BBOX
+    return rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n)
+
+
+def feature_collection(features, crs=None):
+    collection = {"type": "FeatureCollection", "features": features}
+    if crs is not None:
+        collection["crs"] = {"type": "name", "properties": {"name": crs}}
+    return collection
+
+
+def synthetic_schemes(rng, n):
+    """Hydro scheme FeatureCollection in the layout of hydro.json (EPSG:22236)."""
+    lon, lat = random_lonlat(rng, n)
+    x, y = reproject(lon, lat, WGS84, SCHEME_CRS)
+    status = rng.choice(STATUSES, n, p=STATUS_WEIGHTS)
+    features = [
+        {
+            "type": "Feature",
+            "id": f"hydropowerschemesapprox.{i + 1}",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [round(x[i], 4), round(y[i], 4)],
+            },
+            "properties": {
+                "fid": i + 1,
+                "Scheme_No": i + 1,
+                "Scheme_Nam": f"Scheme {i + 1}",
+                "Status": str(status[i]),
+            },
+        }
+        for i in range(n)
+    ]
+    return feature_collection(features, "urn:ogc:def:crs:EPSG::22236")
+
+
+def synthetic_places(rng, n):
+    """Gazetteer FeatureCollection in the layout of mlwplaces_point.json."""
+    lon, lat = random_lonlat(rng, n)
+    place_class = rng.choice([1, 2, 3, 4, 5], n, p=[0.001, 0.01, 0.05, 0.3, 0.639])
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon[i], lat[i]]},
+            "properties": {
+                "fid": i + 1,
+                "NAME": f"Place {i + 1}",
+                "ADMIN1": f"Region {i % 28}",
+                "COUNTRY": "Malawi",
+                "CNTRY_FIPS": "MI",
+                "TYPE": int(place_class[i]),
+                "CLASS": int(place_class[i]),
+                "LONGITUDE": lon[i],
+                "LATITUDE": lat[i],
+                "ID": float(i + 1),
+            },
+        }
+        for i in range(n)
+    ]
+    return feature_collection(features)
+
+
+def synthetic_roads(rng, n):
+    """Road GeoDataFrame (WGS84) shaped like the HOT OSM export.
+
+    Roads are random walks; most start on a vertex of an earlier road, so
+    the network has real junctions for the graph and tiling code.
+    """
+    counts = rng.integers(*ROAD_VERTICES, n)
+    steps = rng.normal(0, ROAD_STEP_DEG, (counts.sum(), 2))
+    road = np.repeat(np.arange(n), counts)
+    first = np.r_[0, np.cumsum(counts)[:-1]]
+
+    # Start points: fresh random points for a few roads, earlier walks'
+    # start points for the rest so roads meet
+    lon, lat = random_lonlat(rng, n)
+    starts = np.column_stack((lon, lat))
+    joins = rng.random(n) < 0.8
+    joins[0] = False
+    anchor = (rng.random(n) * np.arange(n)).astype(int)
+    starts[joins] = starts[anchor[joins]]
+
+    steps[first] = starts
+    coords = np.empty_like(steps)
+    for axis in range(2):
+        coords[:, axis] = np.cumsum(steps[:, axis])
+        offsets = np.r_[0, coords[first[1:] - 1, axis]]
+        coords[:, axis] -= np.repeat(offsets, counts)
+
+    minx, miny, maxx, maxy = MALAWI_BBOX
+    coords[:, 0] = np.clip(coords[:, 0], minx, maxx)
+    coords[:, 1] = np.clip(coords[:, 1], miny, maxy)
+    return gpd.GeoDataFrame(
+        {
+            "osm_id": np.arange(1, n + 1, dtype=np.int64) * 10,
+            "highway": rng.choice(HIGHWAYS, n, p=HIGHWAY_WEIGHTS),
+            "surface": rng.choice(SURFACES, n),
+        },
+        geometry=shapely.linestrings(coords, indices=road),
+        crs=WGS84,
+    )
+
+
+def write_dataset(directory, scale, seed=0):
+    """Write hydro.json, places.json and roads.parquet for ``scale`` to
+    ``directory``; returns their paths."""
+    rng = np.random.default_rng(seed)
+    sizes = sizes_for_scale(scale)
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        "schemes": os.path.join(directory, "hydro.json"),
+        "places": os.path.join(directory, "places.json"),
+        "roads": os.path.join(directory, "roads.parquet"),
+    }
+    with open(paths["schemes"], "w") as f:
+        json.dump(synthetic_schemes(rng, sizes["schemes"]), f)
+    with open(paths["places"], "w") as f:
+        json.dump(synthetic_places(rng, sizes["places"]), f)
+    roads = synthetic_roads(rng, sizes["roads"])
+    roads = roads.iloc[roads.hilbert_distance().argsort()].reset_index(drop=True)
+    roads.to_parquet(paths["roads"], compression="zstd", write_covering_bbox=True)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic Malawi schemes/places/roads dataset."
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--scale", type=float, default=10, help="multiple of the real data sizes"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = write_dataset(args.directory, args.scale, args.seed)
+    sizes = sizes_for_scale(args.scale)
+    for name, path in paths.items():
+        print(f"{name}: {sizes[name]} features written to {path}")
+
+
+if __name__ == "__main__":
+    main()
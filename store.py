@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import threading
+import duckdb
+from ingest import (
+    HYDRO_FILE,
+    PLACES_FILE,
+    PLACES_PARQUET,
+    ROADS_FILE,
+    load_places,
+    load_roads,
+    load_schemes,
+)
+
+DATABASE = "proximity_test"
+
+SPATIAL_EXTENSION_PATH = "./duckdb_extensions/spatial.duckdb_extension"
+HTTPFS_EXTENSION_PATH = "./duckdb_extensions/httpfs.duckdb_extension"
+EXTENSIONS = (SPATIAL_EXTENSION_PATH, HTTPFS_EXTENSION_PATH)
+
+# Table -> (candidate source files, loader). The first file that exists is
+# used, so the GeoParquet copies win once prepare_data.py has written them.
+# Each table is reloaded only when the content hash of its source changes.
+SOURCES = {
+    "hydropower_schemes": ((HYDRO_FILE,), load_schemes),
+    "malawi_places": ((PLACES_PARQUET, PLACES_FILE), load_places),
+    "roads": ((ROADS_FILE,), load_roads),
+}
+
+HASH_CHUNK_SIZE = 1 << 20
+
+# Set to serve a store that was filled beforehand: every dashboard worker
+# then opens the file read-only, which DuckDB allows any number of processes
+# to do at once, and serves what is already stored. DuckDB does not let a
+# writer open the file while readers hold it, so the store can only be
+# refreshed (e.g. with batch.py --store) while the dashboard is stopped.
+READ_ONLY = os.environ.get("HYDRO_STORE_READ_ONLY", "") == "1"
+
+
+def open_store(path=DATABASE, read_only=False, extensions=EXTENSIONS):
+    """Connect to the analytics store and make sure its bookkeeping tables exist."""
+    for extension_path in extensions:
+        if not os.path.exists(extension_path):
+            raise FileNotFoundError(f"DuckDB extension not found at {extension_path}")
+
+    con = duckdb.connect(path, read_only=read_only)
+    for extension_path in extensions:
+        con.sql(f"LOAD '{extension_path}';")
+    if read_only:
+        return con
+
+    con.execute(
+        """
+CREATE TABLE IF NOT EXISTS source_versions (
+    table_name VARCHAR PRIMARY KEY,
+    path VARCHAR,
+    content_hash VARCHAR,
+    size BIGINT,
+    mtime_ns BIGINT,
+    row_count BIGINT,
+    loaded_at TIMESTAMP
+)
+"""
+    )
+    con.execute(
+        """
+CREATE TABLE IF NOT EXISTS derived_versions (
+    table_name VARCHAR PRIMARY KEY,
+    version VARCHAR,
+    built_at TIMESTAMP
+)
+"""
+    )
+    return con
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(con, table, path):
+    # Re-hashing the national roads file on every start is itself slow, so a
+    # file whose size and mtime match the recorded load reuses that hash
+    stat = os.stat(path)
+    row = con.execute(
+        "SELECT path, content_hash, size, mtime_ns FROM source_versions WHERE table_name = ?",
+        [table],
+    ).fetchone()
+    if (
+        row is not None
+        and row[0] == path
+        and row[2:] == (stat.st_size, stat.st_mtime_ns)
+    ):
+        return row[1], stat
+    return file_hash(path), stat
+
+
+def refresh(con, tables=None):
+    """Reload every source table whose file changed since it was last loaded.
+
+    Returns a mapping of table name to ``"loaded"``, ``"unchanged"`` or
+    ``"missing"``.
+    """
+    status = {}
+    for table in tables or SOURCES:
+        paths, loader = SOURCES[table]
+        path = next((p for p in paths if os.path.exists(p)), None)
+        if path is None:
+            status[table] = "missing"
+            continue
+
+        content_hash, stat = source_hash(con, table, path)
+        current = con.execute(
+            "SELECT content_hash FROM source_versions WHERE table_name = ?", [table]
+        ).fetchone()
+        exists = con.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [table]
+        ).fetchone()[0]
+        if current is not None and current[0] == content_hash and exists:
+            # Same contents, but keep size/mtime current so the next start
+            # can skip hashing again
+            con.execute(
+                "UPDATE source_versions SET size = ?, mtime_ns = ? WHERE table_name = ?",
+                [stat.st_size, stat.st_mtime_ns, table],
+            )
+            status[table] = "unchanged"
+            continue
+
+        con.begin()
+        try:
+            row_count = loader(con, path)
+            con.execute(
+                """
+INSERT OR REPLACE INTO source_versions
+VALUES (?, ?, ?, ?, ?, ?, current_timestamp)
+""",
+                [table, path, content_hash, stat.st_size, stat.st_mtime_ns, row_count],
+            )
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        status[table] = "loaded"
+    return status
+
+
+def source_version(con, tables):
+    rows = con.execute(
+        """
+SELECT table_name, content_hash
+FROM source_versions
+WHERE table_name IN (SELECT unnest(?))
+ORDER BY table_name
+""",
+        [list(tables)],
+    ).fetchall()
+    return ";".join(f"{table}={content_hash}" for table, content_hash in rows)
+
+
+def stored_derived(con, table, sources, params):
+    """The derived ``table`` if it is stored and current, else None."""
+    version = f"{source_version(con, sources)}|{json.dumps(params, sort_keys=True)}"
+    current = con.execute(
+        "SELECT version FROM derived_versions WHERE table_name = ?", [table]
+    ).fetchone()
+    exists = con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [table]
+    ).fetchone()[0]
+    if current is not None and current[0] == version and exists:
+        return con.execute(f"SELECT * FROM {table}").fetchdf()
+    return None
+
+
+def materialize(con, table, sources, params, compute, persist=True):
+    """Return the derived ``table``, rebuilding it with ``compute()`` only when
+    its source tables or ``params`` changed since it was last stored.
+
+    With ``persist=False`` (a read-only store) a stale table is recomputed
+    but not written back.
+    """
+    stored = stored_derived(con, table, sources, params)
+    if stored is not None:
+        return stored
+
+    version = f"{source_version(con, sources)}|{json.dumps(params, sort_keys=True)}"
+    results = compute()
+    if not persist:
+        return results
+    con.begin()
+    try:
+        con.register("derived_results", results)
+        con.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM derived_results")
+        con.unregister("derived_results")
+        con.execute(
+            "INSERT OR REPLACE INTO derived_versions VALUES (?, ?, current_timestamp)",
+            [table, version],
+        )
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return results
+
+
+class StoreManager:
+    """Process-wide access to the store.
+
+    One primary connection is opened on first use, with the extensions loaded
+    once; each thread (i.e. each Streamlit session) then works on its own
+    cursor of that connection, so sessions query in parallel without opening
+    the file again. Writes (refresh and materialize) are serialized and are
+    skipped entirely when the store is opened read-only.
+    """
+
+    def __init__(self, path=DATABASE, read_only=READ_ONLY, extensions=EXTENSIONS):
+        self.path = path
+        self.read_only = read_only
+        self.extensions = extensions
+        self._primary = None
+        self._local = threading.local()
+        self._open_lock = threading.Lock()
+        self.write_lock = threading.RLock()
+
+    @property
+    def primary(self):
+        if self._primary is None:
+            with self._open_lock:
+                if self._primary is None:
+                    self._primary = open_store(
+                        self.path, self.read_only, self.extensions
+                    )
+        return self._primary
+
+    def cursor(self):
+        """This thread's cursor on the primary connection."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self.primary.cursor()
+        return cursor
+
+    def refresh(self, tables=None):
+        """``refresh`` on the primary; read-only stores report what exists."""
+        if self.read_only:
+            rows = self.cursor().execute("SELECT table_name FROM duckdb_tables()")
+            existing = {row[0] for row in rows.fetchall()}
+            return {
+                table: "unchanged" if table in existing else "missing"
+                for table in tables or SOURCES
+            }
+        with self.write_lock:
+            return refresh(self.cursor(), tables)
+
+    def materialize(self, table, sources, params, compute):
+        # Current tables are read without the lock; only rebuilds queue up
+        stored = stored_derived(self.cursor(), table, sources, params)
+        if stored is not None:
+            return stored
+        with self.write_lock:
+            return materialize(
+                self.cursor(),
+                table,
+                sources,
+                params,
+                compute,
+                persist=not self.read_only,
+            )
+
+
+STORE = StoreManager()
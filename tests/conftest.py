@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import proximity  # noqa: E402
+import tracing  # noqa: E402
+from cache import CACHE  # noqa: E402
+from store import StoreManager  # noqa: E402
+
+
+@pytest.fixture
+def scheme_store(tmp_path, monkeypatch):
+    """A fresh store for the proximity functions, without the DuckDB
+    extensions (the scheme table does not need them), and an empty cache."""
+    manager = StoreManager(str(tmp_path / "store.duckdb"), False, extensions=())
+    monkeypatch.setattr(proximity, "STORE", manager)
+    CACHE.invalidate()
+    yield manager
+    CACHE.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def no_trace_log(monkeypatch):
+    # Spans opened by the tests must not end up in data/trace.jsonl
+    monkeypatch.setattr(tracing, "TRACE_LOG", "")
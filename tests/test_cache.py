@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import proximity  # noqa: E402
+from cache import CACHE, ResourceCache  # noqa: E402
+
+
+def test_concurrent_misses_build_once():
+    cache = ResourceCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.1)
+        return [1, 2, 3]
+
+    threads = [
+        threading.Thread(target=cache.get, args=("key", build)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    stats = cache.stats().iloc[0]
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_failed_build_is_retried():
+    cache = ResourceCache()
+
+    def fail():
+        raise ValueError("no data")
+
+    try:
+        cache.get("key", fail)
+    except ValueError:
+        pass
+    assert cache.get("key", lambda: "built") == "built"
+
+
+def test_concurrent_store_results_do_not_deadlock(scheme_store):
+    # Cached loaders and the store's write lock are taken by these in
+    # different orders; the road network page runs them side by side
+    functions = [
+        proximity.compute_proximity,
+        proximity.status_proximity,
+        proximity.compute_buffers,
+        proximity.compute_neighbors,
+    ]
+    for _ in range(5):
+        CACHE.invalidate()
+        threads = [threading.Thread(target=f, daemon=True) for f in functions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        assert not any(thread.is_alive() for thread in threads)
@@ -0,0 +1,33 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graph_cache import graph_metrics, load_graph, prune_graphs, save_graph  # noqa: E402
+from road_graph import RoadGraph  # noqa: E402
+
+
+def small_graph(length=1000.0):
+    nodes = np.array([[0, 0], [length, 0]])
+    return RoadGraph(
+        nodes, nodes, np.array([0]), np.array([1]), np.array([length]), np.array([0])
+    )
+
+
+def test_saving_over_a_complete_graph_keeps_it(tmp_path):
+    path = str(tmp_path / "key")
+    save_graph(small_graph(1000.0), path, "key")
+    # A second process finishing the same graph later
+    assert save_graph(small_graph(2000.0), path, "key") == path
+    assert load_graph(path).edge_length.tolist() == [1000.0]
+    assert graph_metrics(path)["edges"] == 1
+    assert os.listdir(tmp_path) == ["key"]
+
+
+def test_prune_keeps_the_most_recently_used(tmp_path):
+    for i, key in enumerate(["a", "b", "c"]):
+        path = str(tmp_path / key)
+        save_graph(small_graph(), path, key)
+        os.utime(path, (i, i))
+    assert prune_graphs(str(tmp_path), keep=2) == 1
+    assert sorted(os.listdir(tmp_path)) == ["b", "c"]
@@ -0,0 +1,82 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from ingest import HYDRO_FILE, SCHEME_COLUMNS, read_feature_collection  # noqa: E402
+from proximity_index import scheme_proximity, status_proximity  # noqa: E402
+
+STATS = ["min_distance", "avg_distance", "max_distance"]
+
+
+@pytest.fixture(scope="module")
+def schemes():
+    return read_feature_collection(os.path.join(ROOT, HYDRO_FILE), SCHEME_COLUMNS)
+
+
+def distance_matrix(points1, points2):
+    # Every pair, in km; the reference the indexes are checked against
+    return (
+        np.hypot(
+            points1[:, None, 0] - points2[None, :, 0],
+            points1[:, None, 1] - points2[None, :, 1],
+        )
+        / 1000
+    )
+
+
+def sorted_rows(frame):
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_scheme_proximity_matches_brute_force(schemes, k):
+    xy = schemes[["longitude", "latitude"]].to_numpy()
+    names = schemes["scheme_name"].to_numpy()
+    distances = distance_matrix(xy, xy)
+    # Schemes sharing a name (including the scheme itself) are not neighbors
+    distances[names[:, None] == names[None, :]] = np.inf
+
+    rows = []
+    for i, row in enumerate(np.sort(distances, axis=1)):
+        nearest = row[np.isfinite(row)][:k]
+        if len(nearest):
+            rows.append(
+                {
+                    "scheme1": names[i],
+                    "status1": schemes["status"].iloc[i],
+                    "min_distance": round(nearest.min(), 2),
+                    "avg_distance": round(nearest.mean(), 2),
+                    "max_distance": round(nearest.max(), 2),
+                    "neighbor_count": len(nearest),
+                }
+            )
+    expected = pd.DataFrame(rows)
+
+    result = scheme_proximity(schemes, k=k, limit=None)
+    assert result["min_distance"].is_monotonic_increasing
+    pd.testing.assert_frame_equal(
+        sorted_rows(result), sorted_rows(expected), check_dtype=False
+    )
+
+
+def test_status_proximity_matches_brute_force(schemes):
+    within_km = 50
+    result = status_proximity(schemes, within_km=within_km)
+
+    statuses = schemes["status"].unique()
+    assert len(result) == len(statuses) * (len(statuses) - 1)
+    xy = schemes[["longitude", "latitude"]].to_numpy()
+    for row in result.itertuples(index=False):
+        distances = distance_matrix(
+            xy[(schemes["status"] == row.status1).to_numpy()],
+            xy[(schemes["status"] == row.status2).to_numpy()],
+        )
+        assert row.min_distance == pytest.approx(round(distances.min(), 2))
+        assert row.avg_distance == pytest.approx(round(distances.mean(), 2))
+        assert row.max_distance == pytest.approx(round(distances.max(), 2))
+        assert row.total_comparisons == distances.size
+        assert row[-1] == (distances <= within_km).sum()
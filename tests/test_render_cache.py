@@ -0,0 +1,72 @@
+import os
+import sys
+import folium
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from render_cache import published_key, render_key, render_map  # noqa: E402
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "input.json"
+    path.write_text("[1, 2, 3]")
+    return str(path)
+
+
+@pytest.fixture
+def builds():
+    return []
+
+
+@pytest.fixture
+def render(tmp_path, source, builds):
+    def build():
+        builds.append(1)
+        return folium.Map(location=[-13.5, 34], zoom_start=7)
+
+    def render(options=None, directory=tmp_path / "renders", **kwargs):
+        return render_map(
+            "test", build, [source], options, directory=str(directory), **kwargs
+        )
+
+    return render
+
+
+def test_unchanged_inputs_are_served_from_the_store(render, builds):
+    html = render()
+    assert render() == html
+    assert len(builds) == 1
+
+
+def test_changed_inputs_render_again(render, builds, source):
+    render()
+    render({"zoom": 8})
+    assert len(builds) == 2
+
+    with open(source, "w") as f:
+        f.write("[4, 5, 6]")
+    render()
+    assert len(builds) == 3
+
+
+def test_published_file_is_adopted(render, builds, source, tmp_path):
+    published = str(tmp_path / "map.html")
+    html = render(path=published)
+    assert published_key(published) == render_key("test", [source], {})
+
+    # A fresh render store, e.g. a new clone with the published map checked in
+    mtime = os.stat(published).st_mtime_ns
+    assert render(path=published, directory=tmp_path / "other") == html
+    assert len(builds) == 1
+    assert os.stat(published).st_mtime_ns == mtime
+
+
+def test_published_file_from_other_inputs_is_replaced(render, builds, tmp_path):
+    published = tmp_path / "map.html"
+    published.write_text("<html>stale</html>")
+    assert published_key(str(published)) is None
+
+    html = render(path=str(published))
+    assert len(builds) == 1
+    assert published.read_text() == html
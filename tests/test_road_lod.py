@@ -0,0 +1,30 @@
+import os
+import sys
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from road_lod import split_at_junctions  # noqa: E402
+
+
+def test_multi_line_parts_are_not_joined():
+    roads = [
+        shapely.MultiLineString([[(0, 0), (1, 0)], [(5, 5), (6, 5)]]),
+        shapely.LineString([(1, 0), (1, 1)]),
+    ]
+    pieces, owner = split_at_junctions(roads)
+    assert [shapely.get_coordinates(p).tolist() for p in pieces] == [
+        [[0, 0], [1, 0]],
+        [[5, 5], [6, 5]],
+        [[1, 0], [1, 1]],
+    ]
+    assert owner.tolist() == [0, 0, 1]
+
+
+def test_lines_split_at_shared_vertices():
+    roads = [
+        shapely.LineString([(0, 0), (1, 0), (2, 0)]),
+        shapely.LineString([(1, 0), (1, 1)]),
+    ]
+    pieces, owner = split_at_junctions(roads)
+    assert len(pieces) == 3
+    assert owner.tolist() == [0, 0, 1]
@@ -0,0 +1,44 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from road_tiles import ROAD_LAYER, encode_tile  # noqa: E402
+
+mapbox_vector_tile = pytest.importorskip("mapbox_vector_tile")
+
+
+def decode(tile):
+    layer = mapbox_vector_tile.decode(tile, default_options={"y_coord_down": True})
+    return layer[ROAD_LAYER]["features"]
+
+
+def test_single_line_round_trip():
+    line = np.array([[10, 20], [30, 20], [30, 50]])
+    (feature,) = decode(encode_tile([(7, "primary", [line])]))
+    assert feature["geometry"]["type"] == "LineString"
+    assert feature["geometry"]["coordinates"] == line.tolist()
+    assert feature["properties"] == {"highway": "primary", "osm_id": 7}
+
+
+def test_multi_line_parts_keep_their_position():
+    # Every part after the first starts from where the previous one ended
+    lines = [
+        np.array([[100, 100], [200, 100]]),
+        np.array([[300, 300], [400, 300]]),
+        np.array([[50, 4000], [60, 4010], [70, 4000]]),
+    ]
+    (feature,) = decode(encode_tile([(1, "secondary", lines)]))
+    assert feature["geometry"]["type"] == "MultiLineString"
+    assert feature["geometry"]["coordinates"] == [line.tolist() for line in lines]
+
+
+def test_collapsed_part_does_not_move_the_next():
+    lines = [
+        np.array([[10, 10], [20, 10]]),
+        np.array([[500, 500], [500, 500]]),
+        np.array([[30, 40], [50, 60]]),
+    ]
+    (feature,) = decode(encode_tile([(2, "tertiary", lines)]))
+    assert feature["geometry"]["coordinates"] == [lines[0].tolist(), lines[2].tolist()]
@@ -0,0 +1,50 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import routing  # noqa: E402
+from road_graph import RoadGraph  # noqa: E402
+from routing import Router  # noqa: E402
+
+
+@pytest.fixture
+def router():
+    # A -- B -- C along two sides of a square, and a separate road D -- E
+    node_metric = np.array(
+        [[0, 0], [1000, 0], [1000, 1000], [5000, 5000], [6000, 5000]], dtype=float
+    )
+    edge_u = np.array([0, 1, 3])
+    edge_v = np.array([1, 2, 4])
+    length = np.hypot(*(node_metric[edge_u] - node_metric[edge_v]).T)
+    graph = RoadGraph(node_metric, node_metric, edge_u, edge_v, length, edge_u)
+    return Router(graph)
+
+
+def test_road_distances_follow_the_roads(router):
+    distances = router.road_distances([[0, 0], [1000, 1000]], [[1000, 1000], [0, 0]])
+    # A to C goes through B, not along the 1.41 km diagonal
+    np.testing.assert_allclose(distances, [[2.0, 0.0], [0.0, 2.0]])
+
+
+def test_road_distances_add_the_hop_to_the_snapped_node(router):
+    distances = router.road_distances([[0, -100]], [[1000, 1300]])
+    np.testing.assert_allclose(distances, [[0.1 + 2.0 + 0.3]])
+
+
+def test_unconnected_points_are_infinitely_far(router):
+    distances = router.road_distances([[0, 0]], [[6000, 5000], [1000, 0]])
+    assert np.isinf(distances[0, 0])
+    assert distances[0, 1] == pytest.approx(1.0)
+
+
+def test_blocks_and_search_direction_do_not_change_distances(router, monkeypatch):
+    points = [[0, 0], [1000, 0], [1000, 1000], [5000, 5000]]
+    expected = router.road_distances(points, points)
+    monkeypatch.setattr(routing, "ROUTE_BLOCK_SIZE", 1)
+    np.testing.assert_array_equal(router.road_distances(points, points), expected)
+    # Fewer targets than sources searches from the targets
+    np.testing.assert_array_equal(
+        router.road_distances(points, points[:1]), expected[:, :1]
+    )
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import store  # noqa: E402
+from ingest import HYDRO_FILE, load_schemes  # noqa: E402
+
+
+@pytest.fixture
+def hydro(tmp_path, monkeypatch):
+    path = str(tmp_path / "hydro.json")
+    shutil.copyfile(os.path.join(ROOT, HYDRO_FILE), path)
+    monkeypatch.setattr(
+        store, "SOURCES", {"hydropower_schemes": ((path,), load_schemes)}
+    )
+    return path
+
+
+@pytest.fixture
+def con(tmp_path):
+    # The scheme table needs none of the DuckDB extensions
+    con = store.open_store(str(tmp_path / "store.duckdb"), extensions=())
+    yield con
+    con.close()
+
+
+def rename_first_scheme(path, name):
+    with open(path) as f:
+        collection = json.load(f)
+    collection["features"][0]["properties"]["Scheme_Nam"] = name
+    with open(path, "w") as f:
+        json.dump(collection, f)
+
+
+def scheme_names(con):
+    rows = con.execute("SELECT scheme_name FROM hydropower_schemes").fetchall()
+    return {row[0] for row in rows}
+
+
+def test_refresh_reloads_only_changed_files(con, hydro):
+    assert store.refresh(con) == {"hydropower_schemes": "loaded"}
+    assert store.refresh(con) == {"hydropower_schemes": "unchanged"}
+
+    # A new mtime alone is not a change
+    os.utime(hydro)
+    assert store.refresh(con) == {"hydropower_schemes": "unchanged"}
+
+    rename_first_scheme(hydro, "Renamed Scheme")
+    assert store.refresh(con) == {"hydropower_schemes": "loaded"}
+    assert "Renamed Scheme" in scheme_names(con)
+
+
+def test_refresh_reports_missing_files(con, monkeypatch, tmp_path):
+    missing = str(tmp_path / "missing.json")
+    monkeypatch.setattr(
+        store, "SOURCES", {"hydropower_schemes": ((missing,), load_schemes)}
+    )
+    assert store.refresh(con) == {"hydropower_schemes": "missing"}
+
+
+def test_materialize_rebuilds_on_new_params_or_sources(con, hydro):
+    store.refresh(con)
+    builds = []
+
+    def compute():
+        builds.append(1)
+        return pd.DataFrame({"count": [len(scheme_names(con))]})
+
+    def materialize(params):
+        return store.materialize(
+            con, "scheme_count", ["hydropower_schemes"], params, compute
+        )
+
+    materialize({"k": 1})
+    materialize({"k": 1})
+    assert len(builds) == 1
+
+    materialize({"k": 2})
+    assert len(builds) == 2
+
+    rename_first_scheme(hydro, "Renamed Scheme")
+    store.refresh(con)
+    materialize({"k": 2})
+    assert len(builds) == 3
+
+    # Not persisted: the stored version stays that of the last build
+    store.materialize(
+        con, "scheme_count", ["hydropower_schemes"], {"k": 3}, compute, persist=False
+    )
+    materialize({"k": 2})
+    assert len(builds) == 4
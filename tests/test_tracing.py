@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tracing  # noqa: E402
+
+
+def test_only_page_runs_are_logged(tmp_path, monkeypatch):
+    log = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_LOG", str(log))
+    monkeypatch.setattr(tracing, "LOG_ALL_ROOTS", False)
+
+    with tracing.span("cache build"):
+        pass
+    assert not log.exists()
+
+    root = tracing.start_page("page")
+    with tracing.span("step"):
+        pass
+    tracing._current.set(None)
+    root.finish()
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [r["span"] for r in records] == ["step", "page"]
+    assert {r["page"] for r in records} == {"page"}
+
+
+def test_log_is_rotated_when_too_large(tmp_path, monkeypatch):
+    log = tmp_path / "trace.jsonl"
+    log.write_text("x" * 2048)
+    monkeypatch.setattr(tracing, "TRACE_LOG_MAX_MB", 1 / 1024)
+    tracing.write_log([{"span": "page"}], str(log))
+    assert (tmp_path / "trace.jsonl.1").read_text() == "x" * 2048
+    assert json.loads(log.read_text()) == {"span": "page"}
@@ -0,0 +1,190 @@
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import streamlit as st
+from ingest import DATA_DIR
+
+# Lightweight tracing for the pages and the analysis code. A span records
+# wall time, CPU time of the thread that ran it, and counters (rows
+# produced, bytes of map HTML written, shared-cache hits and misses). Spans
+# nest through a context variable, so code called from a traced page or
+# pipeline stage is attributed to it; when a page rerun ends, all of its
+# spans are appended to a JSON-lines log. Spans opened outside a page (the
+# command-line tools, tests) are only logged when HYDRO_TRACE_LOG is set.
+TRACE_LOG = os.environ.get("HYDRO_TRACE_LOG", os.path.join(DATA_DIR, "trace.jsonl"))
+LOG_ALL_ROOTS = bool(os.environ.get("HYDRO_TRACE_LOG"))
+
+# The log is moved to <log>.1 (replacing an older one) once it is this large
+TRACE_LOG_MAX_MB = float(os.environ.get("HYDRO_TRACE_LOG_MAX_MB", "50"))
+
+# Set HYDRO_TRACE_PANEL=0 to leave the sidebar panel out
+TRACE_PANEL = os.environ.get("HYDRO_TRACE_PANEL", "1") == "1"
+
+COUNTERS = ("rows", "html_bytes", "cache_hits", "cache_misses")
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_log_lock = threading.Lock()
+
+
+def count_rows(value):
+    """Number of rows in a frame or array result, else None."""
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    return None
+
+
+class Span:
+    def __init__(self, name, parent=None, page=False):
+        self.name = name
+        self.parent = parent
+        self.page = page
+        self.root = parent.root if parent is not None else self
+        self.run = self.root.run if parent is not None else uuid.uuid4().hex[:12]
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.records = []
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.record = None
+
+    def add(self, **counts):
+        with self.lock:
+            for counter, value in counts.items():
+                self.counts[counter] += value
+
+    def add_rows(self, value):
+        rows = count_rows(value)
+        if rows is not None:
+            self.add(rows=rows)
+        return value
+
+    def finish(self):
+        self.record = {
+            "run": self.run,
+            "page": self.root.name if self.root.page else None,
+            "span": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "depth": self.depth,
+            "time": self.started,
+            "offset_s": self.started - self.root.started,
+            "wall_s": time.perf_counter() - self.wall,
+            "cpu_s": time.thread_time() - self.cpu,
+            "thread": threading.current_thread().name,
+            **self.counts,
+        }
+        with self.root.lock:
+            self.root.records.append(self.record)
+        if self.parent is None and (self.page or LOG_ALL_ROOTS):
+            write_log(self.records)
+
+
+def current_span():
+    return _current.get()
+
+
+def note(**counts):
+    """Add to the counters of the innermost open span, if there is one."""
+    active = _current.get()
+    if active is not None:
+        active.add(**counts)
+
+
+@contextlib.contextmanager
+def span(name, **counts):
+    """Time the enclosed block as a span named ``name``."""
+    active = Span(name, _current.get())
+    active.add(**counts)
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+        active.finish()
+
+
+def traced(name=None):
+    """Decorator running the function in a span; frame and array results
+    are counted as rows."""
+
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label) as s:
+                return s.add_rows(func(*args, **kwargs))
+
+        return wrapper
+
+    return decorate
+
+
+def write_log(records, path=None):
+    # Tracing must never break a page, so a log that cannot be written is
+    # skipped
+    path = TRACE_LOG if path is None else path
+    if not path:
+        return
+    lines = "".join(json.dumps(record) + "\n" for record in records)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _log_lock:
+            if (
+                os.path.exists(path)
+                and os.path.getsize(path) > TRACE_LOG_MAX_MB * 2**20
+            ):
+                os.replace(path, f"{path}.1")
+            with open(path, "a") as f:
+                f.write(lines)
+    except OSError:
+        pass
+
+
+def start_page(name):
+    """Open the root span of a page rerun; closed by :func:`performance_panel`."""
+    root = Span(name, page=True)
+    _current.set(root)
+    return root
+
+
+def trace_table(records):
+    table = pd.DataFrame(
+        records, columns=["span", "depth", "offset_s", "wall_s", "cpu_s", *COUNTERS]
+    )
+    table = table.sort_values(["offset_s", "depth"]).reset_index(drop=True)
+    table["span"] = [
+        " " * depth + name for name, depth in zip(table["span"], table["depth"])
+    ]
+    return table.drop(columns="depth")
+
+
+def performance_panel(container=None):
+    """End the page's root span, log it and show its spans in an expander
+    (the sidebar by default)."""
+    root = _current.get()
+    if root is None:
+        return
+    root = root.root
+    _current.set(None)
+    root.finish()
+    if not TRACE_PANEL:
+        return
+
+    table = trace_table(root.records)
+    with (container or st.sidebar).expander("Performance"):
+        st.caption(
+            f"{root.record['wall_s']:.2f} s, "
+            f"{table['cache_hits'].sum()} cache hits, "
+            f"{table['cache_misses'].sum()} misses, "
+            f"{table['html_bytes'].sum() / 2**10:.0f} KB of map HTML"
+        )
+        st.dataframe(table, hide_index=True, use_container_width=True)
@@ -0,0 +1,136 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+from cache import cached
+from ingest import HYDRO_FILE, PLACES_FILE, PLACES_PARQUET
+from proximity import compute_buffers, load_places
+from reproject import WGS84, scheme_locations
+from road_data import MAJOR_HIGHWAYS, MALAWI_BBOX, cached_roads, roads_path
+
+# Viewport queries: each layer is held in an STRtree over its WGS84
+# geometries, and a map asks only for the features intersecting the bounds
+# st_folium returned for it. The zoom decides how much detail is worth
+# sending: minor road classes and small places only appear once zoomed in.
+
+LAYERS = ("schemes", "roads", "places", "buffers")
+
+# The bounds are padded by this fraction on each side, so a short pan does
+# not immediately reach past what was sent
+VIEWPORT_PADDING = 0.1
+
+# (minimum zoom, classes shown from that zoom on)
+ROAD_CLASSES_BY_ZOOM = (
+    (0, ("primary",)),
+    (9, ("primary", "secondary")),
+    (11, MAJOR_HIGHWAYS),
+)
+PLACE_CLASSES_BY_ZOOM = ((0, 3), (10, None))
+
+# Buffers are only drawn once they are more than a few pixels across
+BUFFER_MIN_ZOOM = 8
+BUFFER_RADIUS_KM = 10
+
+
+class LayerIndex:
+    """STRtree over the geometries of a WGS84 GeoDataFrame."""
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self.tree = shapely.STRtree(self.frame.geometry.values)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def query(self, bbox):
+        """Rows whose geometry intersects ``bbox`` (minx, miny, maxx, maxy)."""
+        rows = self.tree.query(shapely.box(*bbox), predicate="intersects")
+        return self.frame.iloc[np.sort(rows)]
+
+
+@cached(HYDRO_FILE)
+def scheme_index():
+    schemes = scheme_locations()
+    return LayerIndex(
+        gpd.GeoDataFrame(
+            schemes,
+            geometry=gpd.points_from_xy(schemes["lon"], schemes["lat"]),
+            crs=WGS84,
+        )
+    )
+
+
+@cached(PLACES_PARQUET, PLACES_FILE)
+def place_index():
+    places = load_places()
+    return LayerIndex(
+        gpd.GeoDataFrame(
+            places,
+            geometry=gpd.points_from_xy(places["LONGITUDE"], places["LATITUDE"]),
+            crs=WGS84,
+        )
+    )
+
+
+@cached(roads_path)
+def road_index(highways=MAJOR_HIGHWAYS, bbox=MALAWI_BBOX):
+    return LayerIndex(cached_roads(highways, bbox))
+
+
+@cached(HYDRO_FILE)
+def buffer_index(radius_km=BUFFER_RADIUS_KM):
+    return LayerIndex(compute_buffers(radii_km=(radius_km,)).to_crs(WGS84))
+
+
+def _for_zoom(steps, zoom):
+    return [value for min_zoom, value in steps if zoom >= min_zoom][-1]
+
+
+def viewport_from_state(state, default_zoom=None):
+    """``(bbox, zoom)`` from what ``st_folium`` returned, or ``(None, zoom)``
+    before the map has reported its bounds."""
+    bounds = (state or {}).get("bounds") or {}
+    zoom = (state or {}).get("zoom", default_zoom)
+    south_west, north_east = bounds.get("_southWest"), bounds.get("_northEast")
+    if not south_west or not north_east or south_west.get("lat") is None:
+        return None, zoom
+    return (
+        south_west["lng"],
+        south_west["lat"],
+        north_east["lng"],
+        north_east["lat"],
+    ), zoom
+
+
+def pad_bbox(bbox, padding=VIEWPORT_PADDING):
+    minx, miny, maxx, maxy = bbox
+    dx, dy = (maxx - minx) * padding, (maxy - miny) * padding
+    return minx - dx, miny - dy, maxx + dx, maxy + dy
+
+
+def query_viewport(bbox, zoom, layers=LAYERS, padding=VIEWPORT_PADDING):
+    """``{layer: GeoDataFrame}`` of the features visible in ``bbox`` at ``zoom``.
+
+    ``bbox`` is WGS84 (minx, miny, maxx, maxy); pass None for all of Malawi.
+    """
+    bbox = pad_bbox(bbox, padding) if bbox is not None else MALAWI_BBOX
+    zoom = zoom or 0
+    result = {}
+    if "schemes" in layers:
+        result["schemes"] = scheme_index().query(bbox)
+    if "roads" in layers:
+        roads = road_index().query(bbox)
+        result["roads"] = roads[
+            roads["highway"].isin(_for_zoom(ROAD_CLASSES_BY_ZOOM, zoom))
+        ]
+    if "places" in layers:
+        places = place_index().query(bbox)
+        max_class = _for_zoom(PLACE_CLASSES_BY_ZOOM, zoom)
+        result["places"] = (
+            places if max_class is None else places[places["CLASS"] <= max_class]
+        )
+    if "buffers" in layers:
+        buffers = buffer_index()
+        result["buffers"] = (
+            buffers.query(bbox) if zoom >= BUFFER_MIN_ZOOM else buffers.frame.iloc[:0]
+        )
+    return result